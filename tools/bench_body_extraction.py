@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Benchmark email body snippet extraction on synthetic Gmail payloads.
+
+Compares gmail_scanner._extract_body_snippet against the previous
+decode-everything, two-levels-deep implementation.
+
+Usage:
+    python tools/bench_body_extraction.py
+    python tools/bench_body_extraction.py --size-mb 20 --depth 50
+"""
+
+import argparse
+import base64
+import timeit
+
+from gmail_scanner import _extract_body_snippet
+
+
+def _legacy_extract_body_snippet(payload: dict, max_chars: int = 500) -> str:
+    """The original implementation, kept here as the baseline."""
+    if payload.get("mimeType") == "text/plain" and payload.get("body", {}).get("data"):
+        text = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="replace")
+        return text[:max_chars]
+
+    for part in payload.get("parts", []):
+        if part.get("mimeType") == "text/plain" and part.get("body", {}).get("data"):
+            text = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="replace")
+            return text[:max_chars]
+
+        for subpart in part.get("parts", []):
+            if subpart.get("mimeType") == "text/plain" and subpart.get("body", {}).get("data"):
+                text = base64.urlsafe_b64decode(subpart["body"]["data"]).decode("utf-8", errors="replace")
+                return text[:max_chars]
+
+    return ""
+
+
+def _encode(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def _large_plain(size_mb: int) -> dict:
+    """A single huge text/plain body."""
+    line = "I'd love to book a tarot reading for our company party next month. "
+    text = line * (size_mb * 1024 * 1024 // len(line))
+    return {"mimeType": "text/plain", "body": {"data": _encode(text)}}
+
+
+def _deep_multipart(depth: int) -> dict:
+    """multipart/mixed nested `depth` levels, with a PDF attachment at every level."""
+    attachment = {
+        "mimeType": "application/pdf",
+        "filename": "flyer.pdf",
+        "body": {"attachmentId": "ANGjdJ8", "size": 250_000},
+    }
+    node = {
+        "mimeType": "multipart/alternative",
+        "parts": [
+            {"mimeType": "text/plain", "body": {"data": _encode("Hi Holly, are you free on the 31st?")}},
+            {"mimeType": "text/html", "body": {"data": _encode("<p>Hi Holly, are you free on the 31st?</p>")}},
+        ],
+    }
+    for _ in range(depth):
+        node = {"mimeType": "multipart/mixed", "parts": [node, attachment]}
+    return node
+
+
+def _large_html(size_mb: int) -> dict:
+    """HTML-only body (no text/plain alternative) behind a 32 KB inline style block."""
+    style = "<style>" + ".c{color:#333;margin:0}" * (32 * 1024 // 22) + "</style>"
+    paragraph = "<p>Can we book you &amp; a friend for our solstice market?</p>"
+    body = paragraph * (size_mb * 1024 * 1024 // len(paragraph))
+    markup = f"<html><head>{style}</head><body>{body}</body></html>"
+    return {
+        "mimeType": "multipart/alternative",
+        "parts": [
+            {"mimeType": "text/html", "body": {"data": _encode(markup)}},
+        ],
+    }
+
+
+def _bench(label: str, payload: dict, runs: int):
+    results = []
+    for name, fn in (("legacy", _legacy_extract_body_snippet), ("walker", _extract_body_snippet)):
+        seconds = min(timeit.repeat(lambda: fn(payload), number=runs, repeat=3)) / runs
+        snippet = fn(payload)
+        results.append((name, seconds, snippet))
+
+    print(f"\n{label}")
+    for name, seconds, snippet in results:
+        preview = snippet[:40].replace("\n", " ") or "(empty)"
+        print(f"  {name:<7} {seconds * 1000:>9.3f} ms   {len(snippet):>3} chars   {preview!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark body snippet extraction")
+    parser.add_argument("--size-mb", type=int, default=5, help="Size of the large bodies")
+    parser.add_argument("--depth", type=int, default=25, help="Nesting depth of the deep payload")
+    parser.add_argument("--runs", type=int, default=20, help="Calls per timing sample")
+    args = parser.parse_args()
+
+    _bench(f"Large text/plain ({args.size_mb} MB)", _large_plain(args.size_mb), args.runs)
+    _bench(f"Deep multipart ({args.depth} levels + attachments)", _deep_multipart(args.depth), args.runs)
+    _bench(f"HTML-only ({args.size_mb} MB)", _large_html(args.size_mb), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark single-email vs batched classification against the real API.
+
+Classifies the same synthetic emails both ways and reports tokens and
+latency per email, plus how often the two paths agree. Uses
+ANTHROPIC_API_KEY and costs a few cents per run.
+
+Usage:
+    python tools/bench_classifier.py
+    python tools/bench_classifier.py --emails 40 --batch-size 20
+"""
+
+import argparse
+import itertools
+import time
+
+from email_classifier import classify_emails, get_usage
+
+SAMPLE_EMAILS = [
+    ("Dana Whitfield", "dana.whitfield@gmail.com", "Tarot at our holiday party?",
+     "Hi Holly! I'm organizing our office holiday party on Dec 12 in Portland, about 40 people. "
+     "Would you be available for 3 hours of readings? What would that cost?"),
+    ("UPS", "mcinfo@ups.com", "Your package is on the way",
+     "Your shipment 1Z999AA10123456784 is scheduled for delivery tomorrow by end of day."),
+    ("Priya N.", "priya.n@outlook.com", "Beginner classes",
+     "Do you have any beginner tarot classes coming up? I just got my first deck and want to learn."),
+    ("Lena Ortiz", "lena@moonriverfestival.org", "Vendor spot — Moon River Festival",
+     "We'd love to have Crystal Seed Tarot as a reader at Moon River Festival this August. "
+     "Booth fees are waived for readers. Interested?"),
+    ("Chase Bank", "alerts@chase.com", "Your statement is ready",
+     "Your monthly statement for account ending 4421 is now available online."),
+    ("Mom", "karen.cole1958@yahoo.com", "Sunday dinner",
+     "Are you and the kids still coming Sunday? I'm making the lasagna."),
+    ("Marcus Bell", "marcus@bellcreative.co", "Collab idea",
+     "I run a small candle studio and thought a tarot x candle pop-up could be fun. Want to chat?"),
+    ("Quick Loans", "offers@fastcash-now.biz", "You're pre-approved!!!",
+     "Congratulations! You are pre-approved for up to $5,000. Click now to claim your cash."),
+]
+
+
+def _emails(count: int) -> list[dict]:
+    """`count` emails cycled from the samples, made unique so nothing is deduplicated."""
+    emails = []
+    for i, (name, sender, subject, snippet) in zip(range(count), itertools.cycle(SAMPLE_EMAILS)):
+        emails.append(
+            {
+                "sender_name": name,
+                "sender_email": sender,
+                "subject": f"{subject} (#{i})",
+                "snippet": snippet,
+            }
+        )
+    return emails
+
+
+def _run(emails: list[dict], batch_size: int) -> tuple[list, dict, float]:
+    before = get_usage()
+    start = time.perf_counter()
+    # Sequential and unthrottled, so the timings are pure request latency
+    results = classify_emails(
+        emails, concurrency=1, requests_per_minute=100_000, batch_size=batch_size
+    )
+    elapsed = time.perf_counter() - start
+    after = get_usage()
+    usage = {k: after[k] - before[k] for k in after}
+    return results, usage, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched email classification")
+    parser.add_argument("--emails", type=int, default=20, help="Number of emails to classify")
+    parser.add_argument("--batch-size", type=int, default=10, help="Emails per batched request")
+    args = parser.parse_args()
+
+    emails = _emails(args.emails)
+    runs = {
+        "single": _run(emails, batch_size=1),
+        f"batch={args.batch_size}": _run(emails, batch_size=args.batch_size),
+    }
+
+    print(f"\n{args.emails} emails, one request at a time\n")
+    print(f"  {'path':<10} {'requests':>8} {'in tok/email':>13} {'out tok/email':>14} {'s/email':>8}")
+    for name, (results, usage, elapsed) in runs.items():
+        n = len(emails)
+        print(
+            f"  {name:<10} {usage['requests']:>8} {usage['input_tokens'] / n:>13.0f} "
+            f"{usage['output_tokens'] / n:>14.0f} {elapsed / n:>8.2f}"
+        )
+
+    (single, _, _), (batched, _, _) = runs.values()
+    agree = sum(
+        1
+        for a, b in zip(single, batched)
+        if isinstance(a, dict) and isinstance(b, dict) and a["classification"] == b["classification"]
+    )
+    print(f"\n  Same classification on both paths: {agree}/{len(emails)}")
+
+
+if __name__ == "__main__":
+    main()
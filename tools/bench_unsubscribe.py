@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Benchmark token unsubscribes against a synthetic contact sheet.
+
+Nothing touches Google: the sheet is held in memory behind the handful of
+Sheets API calls SheetsContactStore makes, and the mirror goes to a
+temporary directory. Compares the old path (download A:H, scan for the
+token, download A:H again to find the row) with the token index.
+
+Usage:
+    python tools/bench_unsubscribe.py
+    python tools/bench_unsubscribe.py --contacts 50000 --unsubscribes 200
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("GOOGLE_SHEETS_ID", "benchmark")
+os.environ.setdefault("UNSUBSCRIBE_SECRET", "benchmark")
+
+from sheet_mirror import SheetMirror  # noqa: E402
+from sheets_manager import HEADERS, SheetsContactStore, new_contact_row  # noqa: E402
+
+A1_RANGE = re.compile(r"!([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?")
+
+
+class _Request:
+    def __init__(self, service, result: dict):
+        self._service = service
+        self._result = result
+
+    def execute(self) -> dict:
+        self._service.requests += 1
+        self._service.bytes += len(json.dumps(self._result))
+        return self._result
+
+
+class FakeSheet:
+    """Just enough of spreadsheets().values() for SheetsContactStore."""
+
+    def __init__(self, rows: list[list[str]]):
+        self.rows = rows
+        self.requests = 0
+        self.bytes = 0
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _cells(self, a1: str) -> list[list[str]]:
+        first_col, first_row, last_col, last_row = A1_RANGE.search(a1).groups()
+        start = ord(first_col) - ord("A")
+        end = ord(last_col or first_col) - ord("A") + 1
+        top = int(first_row or 1) - 1
+        bottom = int(last_row) if last_row else len(self.rows)
+        return [row[start:end] for row in self.rows[top:bottom]]
+
+    def get(self, spreadsheetId, range):
+        return _Request(self, {"range": range, "values": self._cells(range)})
+
+    def batchGet(self, spreadsheetId, ranges, majorDimension="ROWS"):
+        value_ranges = []
+        for a1 in ranges:
+            cells = self._cells(a1)
+            if majorDimension == "COLUMNS":
+                cells = [list(column) for column in zip(*cells)]
+            value_ranges.append({"range": a1, "values": cells})
+        return _Request(self, {"valueRanges": value_ranges})
+
+    def batchUpdate(self, spreadsheetId, body):
+        for update in body["data"]:
+            _, row, _, _ = A1_RANGE.search(update["range"]).groups()
+            self.rows[int(row) - 1][HEADERS.index("Status")] = update["values"][0][0]
+        return _Request(self, {})
+
+
+def _linear_unsubscribe(sheet: FakeSheet, token: str) -> bool:
+    """The pre-index path: two full downloads and two scans per unsubscribe."""
+    rows = sheet.get("benchmark", "Sheet1!A:H").execute()["values"]
+    email = next((row[0] for row in rows[1:] if row[6] == token), None)
+    if email is None:
+        return False
+    rows = sheet.get("benchmark", "Sheet1!A:H").execute()["values"]
+    for i, row in enumerate(rows[1:], start=2):
+        if row[0].lower() == email.lower():
+            sheet.batchUpdate("benchmark", {"data": [{"range": f"Sheet1!F{i}", "values": [["unsubscribed"]]}]}).execute()
+            return True
+    return False
+
+
+def _report(label: str, sheet: FakeSheet, elapsed: float, n: int):
+    print(
+        f"  {label:<22} {elapsed / n * 1000:8.2f} ms/unsubscribe  "
+        f"{sheet.requests / n:5.1f} requests  {sheet.bytes / n / 1024:9.1f} KB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark token unsubscribes on a synthetic sheet")
+    parser.add_argument("--contacts", type=int, default=50_000)
+    parser.add_argument("--unsubscribes", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"Building a {args.contacts}-contact sheet...")
+    rows = [list(HEADERS)] + [
+        new_contact_row(f"contact{i}@example.com", f"Contact {i}", "benchmark", "general_interest", "x" * 40)
+        for i in range(args.contacts)
+    ]
+    tokens = [row[6] for row in random.Random(0).sample(rows[1:], args.unsubscribes)]
+
+    sheet = FakeSheet([list(row) for row in rows])
+    start = time.perf_counter()
+    for token in tokens:
+        assert _linear_unsubscribe(sheet, token)
+    _report("linear scan", sheet, time.perf_counter() - start, len(tokens))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mirror = Path(tmp) / "mirror.db"
+
+        sheet = FakeSheet([list(row) for row in rows])
+        store = SheetsContactStore(service=sheet, mirror=SheetMirror(mirror))
+        start = time.perf_counter()
+        store.unsubscribe_by_token(tokens[0])
+        print(f"\n  Index build (first unsubscribe): {time.perf_counter() - start:.2f}s, {sheet.bytes / 1024:.0f} KB")
+
+        sheet.requests = sheet.bytes = 0
+        start = time.perf_counter()
+        for token in tokens[1:]:
+            assert store.unsubscribe_by_token(token)
+        _report("token index", sheet, time.perf_counter() - start, len(tokens) - 1)
+
+        # A fresh process: index comes back from the mirror after the probe
+        sheet.requests = sheet.bytes = 0
+        start = time.perf_counter()
+        store = SheetsContactStore(service=sheet, mirror=SheetMirror(mirror))
+        store.unsubscribe_by_token(tokens[0])
+        _report("from mirror (cold)", sheet, time.perf_counter() - start, 1)
+
+        # ...and stays loaded for the unsubscribes after it
+        sheet.requests = sheet.bytes = 0
+        start = time.perf_counter()
+        for token in tokens[1:]:
+            assert store.unsubscribe_by_token(token)
+        _report("from mirror (warm)", sheet, time.perf_counter() - start, len(tokens) - 1)
+
+    unsubscribed = sum(row[5] == "unsubscribed" for row in sheet.rows)
+    print(f"\n{unsubscribed} of {args.contacts} contacts unsubscribed in the sheet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""On-disk cache of email classifications, so identical input never pays for a second LLM call.
+
+Entries are keyed by a hash of (sender, subject, normalized snippet, prompt
+version), expire after CLASSIFICATION_CACHE_TTL_DAYS and are evicted least
+recently used beyond CLASSIFICATION_CACHE_MAX_ENTRIES. Senders classified
+not_relevant with high confidence are remembered separately and skipped
+outright for SENDER_SKIP_DAYS.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from config import (
+    CLASSIFICATION_CACHE_DB,
+    CLASSIFICATION_CACHE_MAX_ENTRIES,
+    CLASSIFICATION_CACHE_TTL_DAYS,
+    DATA_DIR,
+    SENDER_SKIP_DAYS,
+)
+
+DAY = 24 * 60 * 60
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def cache_key(email: dict, prompt_version: str) -> str:
+    """Hash of the classifier's inputs; whitespace/case-only differences in the snippet collide."""
+    snippet = WHITESPACE.sub(" ", (email.get("snippet") or "")[:500]).strip().lower()
+    parts = [email["sender_email"].lower(), email.get("subject") or "", snippet, prompt_version]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class ClassificationCache:
+    """SQLite-backed classification cache with TTL, LRU eviction and sender shortcuts.
+
+    Not thread-safe: look up and store from the thread that owns the cache
+    and hand only the misses to worker threads.
+    """
+
+    def __init__(self, prompt_version: str, path: Path = CLASSIFICATION_CACHE_DB):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+        self.sender_skips = 0
+
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                last_used INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+            CREATE TABLE IF NOT EXISTS senders (
+                sender TEXT PRIMARY KEY,
+                decided_at INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used beyond the size bound."""
+        now = int(time.time())
+        self._conn.execute(
+            "DELETE FROM results WHERE created_at < ?", (now - CLASSIFICATION_CACHE_TTL_DAYS * DAY,)
+        )
+        self._conn.execute(
+            "DELETE FROM senders WHERE decided_at < ?", (now - SENDER_SKIP_DAYS * DAY,)
+        )
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            "SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (CLASSIFICATION_CACHE_MAX_ENTRIES,),
+        )
+        self._conn.commit()
+
+    def get(self, email: dict) -> dict | None:
+        """Return a cached (or sender-shortcut) classification, or None on a miss."""
+        now = int(time.time())
+        sender = email["sender_email"].lower()
+        row = self._conn.execute(
+            "SELECT 1 FROM senders WHERE sender = ? AND decided_at >= ?",
+            (sender, now - SENDER_SKIP_DAYS * DAY),
+        ).fetchone()
+        if row:
+            self.sender_skips += 1
+            return {
+                "should_add": False,
+                "classification": "not_relevant",
+                "confidence": "high",
+                "reason": "Sender was recently classified not relevant (cached)",
+            }
+
+        key = cache_key(email, self.prompt_version)
+        row = self._conn.execute(
+            "SELECT result FROM results WHERE key = ? AND created_at >= ?",
+            (key, now - CLASSIFICATION_CACHE_TTL_DAYS * DAY),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, email: dict, result: dict):
+        """Store a fresh classification."""
+        now = int(time.time())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (cache_key(email, self.prompt_version), json.dumps(result), now, now),
+        )
+        if result.get("classification") == "not_relevant" and result.get("confidence") == "high":
+            self._conn.execute(
+                "INSERT OR REPLACE INTO senders (sender, decided_at) VALUES (?, ?)",
+                (email["sender_email"].lower(), now),
+            )
+        self._conn.commit()
+
+    def close(self):
+        self._evict()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
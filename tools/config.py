@@ -1,7 +1,10 @@
 """Configuration and environment variable loading for email list management tools."""
 
 import os
+import time
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
 
 # Base paths
 TOOLS_DIR = Path(__file__).parent
@@ -20,10 +23,34 @@ SCOPES = [
 # State tracking
 LAST_SCAN_FILE = DATA_DIR / "last_scan.json"
 MANUAL_REVIEW_FILE = DATA_DIR / "manual_review.json"
+IMPORT_CHECKPOINT_FILE = DATA_DIR / "import_checkpoint.json"
+PROCESSED_IDS_DB = DATA_DIR / "processed_ids.db"
+CLASSIFICATION_CACHE_DB = DATA_DIR / "classification_cache.db"
+SHEET_MIRROR_DB = DATA_DIR / "sheet_mirror.db"
+CONTACTS_DB = DATA_DIR / "contacts.db"
+CONTACTS_CSV = DATA_DIR / "contacts.csv"
+VERDICT_LOG_FILE = DATA_DIR / "verdicts.jsonl"
+LOCAL_MODEL_FILE = DATA_DIR / "local_model.npz"
+RUN_REPORT_FILE = DATA_DIR / "run_reports.jsonl"  # one JSON line per run_scan run
+PROFILE_FILE = DATA_DIR / "run_scan.prof"  # written by run_scan --profile
+# Processed IDs are kept this long past the after: window, since Gmail
+# interprets after:YYYY/MM/DD in the account's timezone rather than UTC
+PROCESSED_ID_GRACE_DAYS = 1
+
+# Where the contact list lives: "sheets", "sqlite" or "csv" (see contacts.py)
+CONTACT_BACKEND = "sheets"
 
 # Google Sheet
 SHEET_NAME = "Crystal Seed Tarot — Email List"
 SHEET_RANGE = "Sheet1"
+SHEET_WRITE_BATCH_SIZE = 500  # buffered appends / status updates per flush
+SHEET_WRITE_RETRIES = 5  # backoff retries on 429 and transient 5xx
+IMPORT_CHUNK_SIZE = 1000  # CSV rows per bulk append / import checkpoint
+
+# Gmail API batching — Google recommends at most 50 requests per batch
+GMAIL_BATCH_SIZE = 50
+GMAIL_BATCH_RETRIES = 3  # retries for rate-limited / transient per-item failures
+GMAIL_FAILED_FETCH_RUNS = 5  # scans a message that won't fetch is retried in before it's dropped
 
 # Gmail search — exclude common noise
 GMAIL_EXCLUDE_SENDERS = [
@@ -40,6 +67,7 @@ GMAIL_EXCLUDE_SENDERS = [
     "txt.voice.google.com",
 ]
 
+# Server-side exclusions shared by the lead and unsubscribe stages
 GMAIL_EXCLUDE_QUERY_PARTS = [
     "from:noreply",
     "from:no-reply",
@@ -47,12 +75,20 @@ GMAIL_EXCLUDE_QUERY_PARTS = [
     "from:mailer-daemon",
     "category:promotions",
     "category:social",
-    "category:updates",
-    "category:forums",
-    "unsubscribe",  # mass emails that already have unsubscribe
     "from:txt.voice.google.com",  # Google Voice notifications
 ]
 
+# Lead-stage only: Gmail category tabs that never hold new contacts, checked
+# client-side from message labels (history syncs have no query to filter).
+# Promotions and Social are also excluded in the query above; Updates and
+# Forums aren't, so the unsubscribe stage still sees contacts' mail there.
+GMAIL_EXCLUDE_LABELS = {
+    "CATEGORY_PROMOTIONS",
+    "CATEGORY_SOCIAL",
+    "CATEGORY_UPDATES",
+    "CATEGORY_FORUMS",
+}
+
 # AI Classification
 CLASSIFICATION_CATEGORIES = [
     "quote_request",
@@ -64,6 +100,77 @@ CLASSIFICATION_CATEGORIES = [
     "not_relevant",
 ]
 
+# Classification throughput — keep under the Anthropic account's rate limit
+CLASSIFY_CONCURRENCY = 4
+CLASSIFY_BATCH_SIZE = 10  # emails per request; 1 sends each email on its own
+CLASSIFY_REQUESTS_PER_MINUTE = 50
+CLASSIFY_RATE_LIMIT_RETRIES = 3  # on top of the SDK's own retries
+ANTHROPIC_TIMEOUT = 30.0  # seconds per request
+ANTHROPIC_POOL_SIZE = CLASSIFY_CONCURRENCY  # one warm connection per worker
+
+# run_scan pipeline (fetch → route → classify → write)
+PIPELINE_QUEUE_SIZE = 4  # pages buffered between stages before the upstream one waits
+PIPELINE_ROUTE_WORKERS = 2  # pages having bodies fetched and local verdicts made at once
+PIPELINE_CLASSIFY_MAX_PAGES = 8  # waiting pages merged into one classify_emails call
+
+# Classification cache
+CLASSIFICATION_CACHE_TTL_DAYS = 30
+CLASSIFICATION_CACHE_MAX_ENTRIES = 5000
+SENDER_SKIP_DAYS = 14  # skip senders recently classified not_relevant with high confidence
+
+# Local ML classifier (local_model.py) — trained from past LLM verdicts
+LOCAL_MODEL_FEATURES = 2**16  # hashed feature buckets
+LOCAL_MODEL_THRESHOLD = 0.9  # below this probability the email goes to the LLM
+LOCAL_MODEL_MIN_EXAMPLES = 200  # refuse to train on less
+
+# Local pre-classifier — sender reputation. Mail from these domains (or their
+# subdomains) is transactional unless it also reads like a lead, in which
+# case it still goes to the LLM.
+PREFILTER_NOISE_DOMAINS = {
+    "amazon.com",
+    "paypal.com",
+    "venmo.com",
+    "squareup.com",
+    "stripe.com",
+    "etsy.com",
+    "ups.com",
+    "fedex.com",
+    "usps.com",
+    "dhl.com",
+    "chase.com",
+    "bankofamerica.com",
+    "wellsfargo.com",
+    "capitalone.com",
+    "intuit.com",
+    "facebookmail.com",
+    "linkedin.com",
+    "instagram.com",
+    "accounts.google.com",
+}
+
+# Mailbox names that are only ever used by automated systems
+PREFILTER_AUTOMATED_LOCALPARTS = {
+    "alerts",
+    "alert",
+    "auto-confirm",
+    "billing",
+    "bounce",
+    "bounces",
+    "donotreply",
+    "do-not-reply",
+    "invoice",
+    "invoices",
+    "mcinfo",
+    "notify",
+    "order-update",
+    "orders",
+    "receipts",
+    "security",
+    "shipment-tracking",
+    "shipping",
+    "statements",
+}
+
 BUSINESS_CONTEXT = """Crystal Seed Tarot is a tarot reading business run by Holly Nicole, based in Oregon.
 
 Services offered:
@@ -81,27 +188,78 @@ Common incoming emails include:
 """
 
 
+# .env files, highest priority first (os.environ beats both)
+ENV_FILES = [PROJECT_ROOT / ".env.local", PROJECT_ROOT / ".env"]
+ENV_RECHECK_SECONDS = 2.0  # how often get_env stats the files for changes
+
+# (file stamps, parsed values, monotonic time of the last stat)
+_env_cache: tuple[tuple, Mapping[str, str], float] | None = None
+
+
+def _env_file_stamps() -> tuple:
+    stamps = []
+    for env_file in ENV_FILES:
+        try:
+            stat = env_file.stat()
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def _parse_env_file(env_file: Path) -> dict[str, str]:
+    """KEY=value lines; the first definition of a key wins, as with a top-down scan."""
+    values = {}
+    with open(env_file) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                k, v = line.split("=", 1)
+                values.setdefault(k.strip(), v.strip().strip('"').strip("'"))
+    return values
+
+
+def env_file_values() -> Mapping[str, str]:
+    """Read-only view of the values in ENV_FILES.
+
+    The files are parsed once and re-parsed only when one of them changes
+    (checked at most every ENV_RECHECK_SECONDS), so repeated lookups are
+    dictionary hits.
+    """
+    global _env_cache
+    now = time.monotonic()
+    if _env_cache is not None and now - _env_cache[2] < ENV_RECHECK_SECONDS:
+        return _env_cache[1]
+
+    stamps = _env_file_stamps()
+    if _env_cache is not None and _env_cache[0] == stamps:
+        _env_cache = (stamps, _env_cache[1], now)
+        return _env_cache[1]
+
+    values: dict[str, str] = {}
+    for env_file, stamp in zip(ENV_FILES, stamps):
+        if stamp is not None:
+            for k, v in _parse_env_file(env_file).items():
+                values.setdefault(k, v)
+    _env_cache = (stamps, MappingProxyType(values), now)
+    return _env_cache[1]
+
+
 def get_env(key: str, default: str | None = None) -> str:
-    """Load an environment variable, checking .env.local and .env files."""
+    """Load an environment variable, checking .env.local and .env files.
+
+    A key set in a file returns its value even when that's empty.
+    """
     value = os.environ.get(key)
     if value:
         return value
 
-    # Try loading from .env.local then .env
-    for env_file in [PROJECT_ROOT / ".env.local", PROJECT_ROOT / ".env"]:
-        if env_file.exists():
-            with open(env_file) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        k, v = line.split("=", 1)
-                        k = k.strip()
-                        v = v.strip().strip('"').strip("'")
-                        if k == key:
-                            return v
+    value = env_file_values().get(key)
+    if value is not None:
+        return value
 
     if default is not None:
-                return default
+        return default
 
     raise ValueError(
         f"Environment variable {key} not found. "
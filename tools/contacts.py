@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""Contact list storage, independent of where the list lives.
+
+CONTACT_BACKEND in config.py picks the store behind the functions here:
+
+    sheets  the Google Sheet Holly works from (sheets_manager.SheetsContactStore)
+    sqlite  a local SQLite database, for lists past Sheets' quotas and cell limit
+    csv     a local CSV file in HEADERS layout, for handing the list to other tools
+
+Every backend offers the same operations (contacts, emails, get,
+get_by_token, is_subscribed, add, set_status, unsubscribe_by_token,
+append_rows, update_statuses, `email in store`), and rows always use the sheet's
+HEADERS column order. contacts() takes a column projection; the Sheets
+backend only downloads the columns asked for.
+
+The site's /api/unsubscribe only writes to the Sheet, so the sqlite and
+csv backends never see unsubscribes made through a link. Migrating from
+the Sheet brings them across (merge_unsubscribes does just that, and
+generate_unsubscribe --from-store runs it first); migrating to the Sheet
+never undoes them.
+
+Usage:
+    python tools/contacts.py count
+    python tools/contacts.py migrate --from sheets --to sqlite
+    python tools/contacts.py migrate --from sqlite --to sheets   # sync for viewing
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from config import (
+    CONTACT_BACKEND,
+    CONTACTS_CSV,
+    CONTACTS_DB,
+    DATA_DIR,
+    OAUTH_TOKEN_FILE,
+    SCOPES,
+    SHEET_WRITE_BATCH_SIZE,
+)
+from sheets_manager import HEADERS, SheetsContactStore, is_active, new_contact_row
+
+BACKENDS = ("sheets", "sqlite", "csv")
+
+# SQLite column for each sheet header, in HEADERS order
+SQL_COLUMNS = ["email", "name", "source", "date_added", "classification", "status", "token", "notes"]
+
+
+class SqliteContactStore:
+    """Contact backend on a local SQLite database.
+
+    Lookups are indexed queries (unique lowercase email, token), so nothing
+    is loaded up front. Emails are unique case-insensitively; appending an
+    email that already exists is ignored, matching "first row wins".
+    """
+
+    def __init__(self, path: Path = CONTACTS_DB):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS contacts (
+                id INTEGER PRIMARY KEY,  -- insertion order, like sheet rows
+                email TEXT NOT NULL,
+                email_key TEXT NOT NULL UNIQUE,  -- lowercase email
+                name TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                date_added TEXT NOT NULL DEFAULT '',
+                classification TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'active',
+                token TEXT NOT NULL DEFAULT '',
+                notes TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS contacts_token ON contacts (token);
+            """
+        )
+
+    def _contact(self, row: sqlite3.Row | None) -> dict | None:
+        return {h: row[c] for h, c in zip(HEADERS, SQL_COLUMNS)} if row else None
+
+    def _one(self, where: str, value: str) -> dict | None:
+        row = self._conn.execute(f"SELECT * FROM contacts WHERE {where} = ? LIMIT 1", (value,)).fetchone()
+        return self._contact(row)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def __contains__(self, email: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM contacts WHERE email_key = ?", (email.lower(),)).fetchone() is not None
+
+    def contacts(self, columns: list[str] = HEADERS) -> list[dict]:
+        selected = ", ".join(SQL_COLUMNS[HEADERS.index(name)] for name in columns)
+        query = f"SELECT {selected} FROM contacts ORDER BY id"
+        return [dict(zip(columns, row)) for row in self._conn.execute(query)]
+
+    def emails(self) -> set[str]:
+        return {row[0] for row in self._conn.execute("SELECT email_key FROM contacts")}
+
+    def get(self, email: str) -> dict | None:
+        return self._one("email_key", email.lower())
+
+    def get_by_token(self, token: str) -> dict | None:
+        return self._one("token", token)
+
+    def is_subscribed(self, email: str) -> bool:
+        contact = self.get(email)
+        return bool(contact) and is_active(contact["Status"])
+
+    def append_rows(self, rows: list[list[str]]):
+        """Insert rows in one transaction, skipping emails already present."""
+        placeholders = ", ".join("?" * (len(SQL_COLUMNS) + 1))
+        padded = (row + [""] * (len(HEADERS) - len(row)) for row in rows)
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO contacts (email_key, {', '.join(SQL_COLUMNS)}) VALUES ({placeholders})",
+                ([row[0].lower(), *row[: len(HEADERS)]] for row in padded),
+            )
+
+    def update_statuses(self, changes: dict[str, str]):
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE contacts SET status = ? WHERE email_key = ?",
+                ((status, email.lower()) for email, status in changes.items()),
+            )
+
+    def add(self, email: str, name: str = "", source: str = "manual", classification: str = "", notes: str = "") -> bool:
+        if email in self:
+            return False
+        self.append_rows([new_contact_row(email, name, source, classification, notes)])
+        return True
+
+    def set_status(self, email: str, status: str) -> bool:
+        if email not in self:
+            return False
+        self.update_statuses({email: status})
+        return True
+
+    def unsubscribe_by_token(self, token: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE contacts SET status = 'unsubscribed' WHERE id = (SELECT MIN(id) FROM contacts WHERE token = ?)",
+                (token,),
+            )
+        return cursor.rowcount > 0
+
+    def close(self):
+        self._conn.close()
+
+
+class CsvContactStore:
+    """Contact backend on a CSV file with a HEADERS header row.
+
+    The file is read once and indexed in memory. Appends are appended to
+    the file; status changes rewrite it (atomically, via a temp file).
+    """
+
+    def __init__(self, path: Path = CONTACTS_CSV):
+        self.path = path
+        self._rows: list[list[str]] = []
+        self._by_email: dict[str, list[str]] = {}
+        self._by_token: dict[str, list[str]] = {}
+        if path.exists():
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                for row in reader:
+                    self._index(row + [""] * (len(HEADERS) - len(row)))
+
+    def _index(self, row: list[str]):
+        self._rows.append(row)
+        if row[0]:
+            self._by_email.setdefault(row[0].lower(), row)
+        if row[6]:
+            self._by_token.setdefault(row[6], row)
+
+    def _contact(self, row: list[str] | None) -> dict | None:
+        return dict(zip(HEADERS, row)) if row else None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, email: str) -> bool:
+        return email.lower() in self._by_email
+
+    def contacts(self, columns: list[str] = HEADERS) -> list[dict]:
+        indexes = [HEADERS.index(name) for name in columns]
+        return [{name: row[i] for name, i in zip(columns, indexes)} for row in self._rows]
+
+    def emails(self) -> set[str]:
+        return set(self._by_email)
+
+    def get(self, email: str) -> dict | None:
+        return self._contact(self._by_email.get(email.lower()))
+
+    def get_by_token(self, token: str) -> dict | None:
+        return self._contact(self._by_token.get(token))
+
+    def is_subscribed(self, email: str) -> bool:
+        contact = self.get(email)
+        return bool(contact) and is_active(contact["Status"])
+
+    def append_rows(self, rows: list[list[str]]):
+        new_file = not self.path.exists()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(HEADERS)
+            for row in rows:
+                row = row + [""] * (len(HEADERS) - len(row))
+                writer.writerow(row)
+                self._index(row)
+
+    def update_statuses(self, changes: dict[str, str]):
+        status_index = HEADERS.index("Status")
+        for email, status in changes.items():
+            row = self._by_email.get(email.lower())
+            if row is not None:
+                row[status_index] = status
+
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(self._rows)
+        tmp.replace(self.path)
+
+    def add(self, email: str, name: str = "", source: str = "manual", classification: str = "", notes: str = "") -> bool:
+        if email.lower() in self._by_email:
+            return False
+        self.append_rows([new_contact_row(email, name, source, classification, notes)])
+        return True
+
+    def set_status(self, email: str, status: str) -> bool:
+        if email.lower() not in self._by_email:
+            return False
+        self.update_statuses({email: status})
+        return True
+
+    def unsubscribe_by_token(self, token: str) -> bool:
+        row = self._by_token.get(token)
+        return row is not None and self.set_status(row[0], "unsubscribed")
+
+
+def open_store(backend: str = CONTACT_BACKEND, creds: Credentials | None = None):
+    """Open a contact backend by name. Only "sheets" needs credentials."""
+    if backend == "sheets":
+        return SheetsContactStore(creds)
+    if backend == "sqlite":
+        return SqliteContactStore()
+    if backend == "csv":
+        return CsvContactStore()
+    raise ValueError(f"Unknown contact backend {backend!r}; expected one of {BACKENDS}")
+
+
+_store = None
+
+
+def get_store(creds: Credentials | None = None):
+    """The process-wide store for CONTACT_BACKEND, opened on first use."""
+    global _store
+    if _store is None:
+        _store = open_store(CONTACT_BACKEND, creds)
+    return _store
+
+
+class ContactWriter:
+    """Buffers contact appends and status updates and writes them in bulk.
+
+    Appends go out through the store's append_rows and status changes
+    through update_statuses — for the Sheets backend, one multi-row append
+    and one batchUpdate — whenever flush_size writes are pending and on
+    flush() / leaving the with-block normally. If the block raises, whatever
+    is still pending is dropped rather than retried on the way out; callers
+    that checkpoint (csv_importer, run_scan's processed IDs) redo that work
+    on the next run. Usage:
+
+        with ContactWriter(get_store(creds)) as writer:
+            writer.add(email, name=name, source="csv_import")
+            writer.remove(other_email)
+    """
+
+    def __init__(self, store, flush_size: int = SHEET_WRITE_BATCH_SIZE):
+        self.store = store
+        self.flush_size = flush_size
+        self._appends: dict[str, list[str]] = {}  # lowercase email -> row
+        self._statuses: dict[str, str] = {}
+        self.requests = 0  # bulk writes sent to the store
+
+    def __len__(self) -> int:
+        return len(self._appends) + len(self._statuses)
+
+    def add(
+        self,
+        email: str,
+        name: str = "",
+        source: str = "manual",
+        classification: str = "",
+        notes: str = "",
+    ) -> bool:
+        """Queue a new contact. Returns False if it's already stored or queued."""
+        return self.add_row(new_contact_row(email, name, source, classification, notes))
+
+    def add_row(self, row: list[str]) -> bool:
+        """Queue a complete row in HEADERS order, e.g. one copied from another backend."""
+        key = row[0].lower()
+        if key in self._appends or row[0] in self.store:
+            return False
+        self._appends[key] = list(row)
+        self._maybe_flush()
+        return True
+
+    def set_status(self, email: str, status: str) -> bool:
+        """Queue a status change. Returns False if the contact doesn't exist."""
+        key = email.lower()
+        if key in self._appends:
+            # Not written yet, so just change the pending row
+            self._appends[key][HEADERS.index("Status")] = status
+            return True
+        if email not in self.store:
+            return False
+        self._statuses[key] = status
+        self._maybe_flush()
+        return True
+
+    def remove(self, email: str) -> bool:
+        """Queue an unsubscribe. Returns False if the contact doesn't exist."""
+        return self.set_status(email, "unsubscribed")
+
+    def pending_status(self, email: str) -> str | None:
+        """The status queued for `email` but not yet written, if any."""
+        key = email.lower()
+        if key in self._appends:
+            return self._appends[key][HEADERS.index("Status")]
+        return self._statuses.get(key)
+
+    def _maybe_flush(self):
+        if len(self) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """Write everything pending: at most one append and one status update."""
+        if self._appends:
+            self.store.append_rows(list(self._appends.values()))
+            self._appends.clear()
+            self.requests += 1
+        if self._statuses:
+            self.store.update_statuses(self._statuses)
+            self._statuses.clear()
+            self.requests += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+
+def get_all_contacts(creds: Credentials, columns: list[str] = HEADERS) -> list[dict]:
+    """Return all contacts as dicts holding just `columns` (all of HEADERS by default)."""
+    return get_store(creds).contacts(columns)
+
+
+def get_all_emails(creds: Credentials) -> set[str]:
+    """Return a set of all stored email addresses (lowercase)."""
+    return get_store(creds).emails()
+
+
+def is_subscribed(creds: Credentials, email: str) -> bool:
+    """Check if an email is stored with active status."""
+    return get_store(creds).is_subscribed(email)
+
+
+def add_contact(
+    creds: Credentials,
+    email: str,
+    name: str = "",
+    source: str = "manual",
+    classification: str = "",
+    notes: str = "",
+) -> bool:
+    """Add a contact. Returns False if email already exists."""
+    return get_store(creds).add(email, name, source, classification, notes)
+
+
+def remove_contact(creds: Credentials, email: str) -> bool:
+    """Set a contact's status to 'unsubscribed'. Returns False if not found."""
+    return get_store(creds).set_status(email, "unsubscribed")
+
+
+def get_contact_by_token(creds: Credentials, token: str) -> dict | None:
+    """Look up a contact by their unsubscribe token."""
+    return get_store(creds).get_by_token(token)
+
+
+def unsubscribe_by_token(creds: Credentials, token: str) -> bool:
+    """Unsubscribe a contact using their token. Returns False if token not found."""
+    return get_store(creds).unsubscribe_by_token(token)
+
+
+def migrate(source, target, batch_size: int = SHEET_WRITE_BATCH_SIZE) -> tuple[int, int]:
+    """Copy contacts missing from `target` and carry unsubscribes across.
+
+    Rows are copied whole (token, date added and all), so unsubscribe links
+    keep working. Statuses only ever move toward "unsubscribed": a contact
+    unsubscribed in `target` (say, through a link, which only the Sheet
+    receives) stays unsubscribed even if `source` still has them active.
+    Safe to re-run: it only ever writes the difference.
+    Returns (added, status_updates).
+    """
+    added = updated = 0
+    with ContactWriter(target, flush_size=batch_size) as writer:
+        for contact in source.contacts():
+            email = contact.get("Email", "")
+            if not email:
+                continue
+            existing = target.get(email)
+            if existing is None:
+                added += writer.add_row([contact.get(h, "") for h in HEADERS])
+            elif contact.get("Status") == "unsubscribed" and existing.get("Status") != "unsubscribed":
+                updated += writer.set_status(email, "unsubscribed")
+    return added, updated
+
+
+def merge_unsubscribes(source, target, batch_size: int = SHEET_WRITE_BATCH_SIZE) -> int:
+    """Mark contacts unsubscribed in `source` as unsubscribed in `target` too.
+
+    Just the status half of migrate(), for bringing the Sheet's link
+    unsubscribes into a local store. Contacts `target` doesn't have are
+    left out. Returns the number of status updates.
+    """
+    updated = 0
+    with ContactWriter(target, flush_size=batch_size) as writer:
+        for contact in source.contacts(["Email", "Status"]):
+            if contact["Status"] != "unsubscribed":
+                continue
+            existing = target.get(contact["Email"])
+            if existing is not None and existing["Status"] != "unsubscribed":
+                updated += writer.set_status(contact["Email"], "unsubscribed")
+    return updated
+
+
+def load_credentials() -> Credentials:
+    """Load saved OAuth credentials."""
+    if not OAUTH_TOKEN_FILE.exists():
+        print("Error: Not authenticated. Run setup.py first.")
+        sys.exit(1)
+
+    creds = Credentials.from_authorized_user_file(str(OAUTH_TOKEN_FILE), SCOPES)
+    if creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+    return creds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or migrate the contact list between backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("count", help="Count contacts in the configured backend")
+    migrate_parser = sub.add_parser("migrate", help="Copy contacts from one backend to another")
+    migrate_parser.add_argument("--from", dest="source", choices=BACKENDS, required=True)
+    migrate_parser.add_argument("--to", dest="target", choices=BACKENDS, required=True)
+    migrate_parser.add_argument("--batch-size", type=int, default=SHEET_WRITE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "count":
+        creds = load_credentials() if CONTACT_BACKEND == "sheets" else None
+        print(f"{len(open_store(CONTACT_BACKEND, creds))} contacts ({CONTACT_BACKEND})")
+        return
+
+    if args.source == args.target:
+        print("Error: --from and --to must differ")
+        sys.exit(1)
+
+    creds = load_credentials() if "sheets" in (args.source, args.target) else None
+    source = open_store(args.source, creds)
+    target = open_store(args.target, creds)
+    print(f"Migrating {len(source)} contacts: {args.source} → {args.target} ({len(target)} already there)")
+
+    start = time.perf_counter()
+    added, updated = migrate(source, target, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"  Added:            {added}")
+    print(f"  Status updates:   {updated}")
+    print(f"  Time:             {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
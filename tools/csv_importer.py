@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
-"""Import existing contacts from a CSV file into the Google Sheet.
+"""Import existing contacts from a CSV file into the contact list.
 
 Usage:
     python tools/csv_importer.py path/to/contacts.csv
+    python tools/csv_importer.py path/to/contacts.csv --restart   # ignore a saved checkpoint
 """
 
+import argparse
 import csv
+import itertools
+import json
 import re
 import sys
+import time
+from pathlib import Path
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 
-from config import OAUTH_TOKEN_FILE, SCOPES
-from sheets_manager import add_contact, get_all_emails
+from config import DATA_DIR, IMPORT_CHECKPOINT_FILE, IMPORT_CHUNK_SIZE, OAUTH_TOKEN_FILE, SCOPES
+from contacts import ContactWriter, get_store
 
 EMAIL_REGEX = re.compile(r"^[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}$")
 
@@ -42,11 +48,42 @@ def load_credentials() -> Credentials:
     return creds
 
 
-def import_csv(csv_path: str):
-    """Import contacts from a CSV file."""
+def _file_signature(path: Path) -> dict:
+    """Identifies the CSV a checkpoint belongs to; any edit invalidates it."""
+    stat = path.stat()
+    return {"path": str(path.resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _load_checkpoint(path: Path) -> dict | None:
+    """Return the saved progress for this exact file, if any."""
+    if not IMPORT_CHECKPOINT_FILE.exists():
+        return None
+    with open(IMPORT_CHECKPOINT_FILE) as f:
+        checkpoint = json.load(f)
+    return checkpoint if checkpoint.get("file") == _file_signature(path) else None
+
+
+def _save_checkpoint(path: Path, counts: dict):
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = IMPORT_CHECKPOINT_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"file": _file_signature(path), **counts}, f, indent=2)
+    tmp.replace(IMPORT_CHECKPOINT_FILE)  # never leave a half-written checkpoint
+
+
+def import_csv(csv_path: str, chunk_size: int = IMPORT_CHUNK_SIZE, restart: bool = False):
+    """Import contacts from a CSV file.
+
+    Rows are streamed in chunks of `chunk_size`, validated, and deduplicated
+    against the file itself and one snapshot of the sheet; each chunk's new
+    contacts go out as a single bulk append. Progress is checkpointed after
+    every chunk, so re-running the same command after a failure continues
+    where it stopped (pass restart=True to start over).
+    """
+    path = Path(csv_path)
     print(f"Reading {csv_path}...")
 
-    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+    with open(path, newline="", encoding="utf-8-sig") as f:
         reader = csv.reader(f)
         headers = next(reader)
 
@@ -64,60 +101,77 @@ def import_csv(csv_path: str):
         else:
             print("No name column found — names will be blank.")
 
-        rows = list(reader)
-
-    print(f"Found {len(rows)} rows in CSV.")
-
-    # Authenticate and get existing contacts
-    creds = load_credentials()
-    existing = get_all_emails(creds)
-    print(f"Found {len(existing)} existing contacts in sheet.")
-
-    added = 0
-    skipped = 0
-    invalid = 0
-
-    for row in rows:
-        if len(row) <= email_col:
-            invalid += 1
-            continue
-
-        email = row[email_col].strip()
-        name = row[name_col].strip() if name_col is not None and len(row) > name_col else ""
-
-        if not email or not EMAIL_REGEX.match(email):
-            invalid += 1
-            continue
-
-        if email.lower() in existing:
-            skipped += 1
-            continue
-
-        success = add_contact(
-            creds,
-            email=email,
-            name=name,
-            source="csv_import",
-            classification="",
-            notes="Imported from CSV",
-        )
-
-        if success:
-            added += 1
-            existing.add(email.lower())  # Track locally to avoid re-querying
-            print(f"  + {email} ({name})" if name else f"  + {email}")
-        else:
-            skipped += 1
+        counts = {"rows": 0, "added": 0, "skipped": 0, "invalid": 0}
+        checkpoint = None if restart else _load_checkpoint(path)
+        if checkpoint:
+            counts = {k: checkpoint[k] for k in counts}
+            print(f"Resuming after row {counts['rows']} ({counts['added']} already added).")
+            for _ in itertools.islice(reader, counts["rows"]):
+                pass
+
+        # Authenticate and take one snapshot of existing contacts; earlier
+        # chunks of a resumed import are already in it
+        creds = load_credentials()
+        store = get_store(creds)
+        existing = store.emails()
+        print(f"Found {len(existing)} existing contacts.\n")
+
+        start = time.perf_counter()
+        resumed_at = counts["rows"]
+
+        # flush_size above the chunk size: each chunk is flushed explicitly,
+        # then checkpointed
+        with ContactWriter(store, flush_size=chunk_size + 1) as writer:
+            while chunk := list(itertools.islice(reader, chunk_size)):
+                for row in chunk:
+                    email = row[email_col].strip() if len(row) > email_col else ""
+                    name = row[name_col].strip() if name_col is not None and len(row) > name_col else ""
+
+                    if not email or not EMAIL_REGEX.match(email):
+                        counts["invalid"] += 1
+                    elif email.lower() in existing:
+                        counts["skipped"] += 1
+                    else:
+                        writer.add(
+                            email=email,
+                            name=name,
+                            source="csv_import",
+                            classification="",
+                            notes="Imported from CSV",
+                        )
+                        existing.add(email.lower())
+                        counts["added"] += 1
+
+                writer.flush()
+                counts["rows"] += len(chunk)
+                _save_checkpoint(path, counts)
+
+                elapsed = time.perf_counter() - start
+                rate = (counts["rows"] - resumed_at) / elapsed if elapsed else 0
+                print(
+                    f"  {counts['rows']} rows: {counts['added']} added, {counts['skipped']} skipped, "
+                    f"{counts['invalid']} invalid ({rate:.0f} rows/s)"
+                )
+
+    IMPORT_CHECKPOINT_FILE.unlink(missing_ok=True)
+    elapsed = time.perf_counter() - start
 
     print(f"\nImport complete:")
-    print(f"  Added:   {added}")
-    print(f"  Skipped: {skipped} (already in sheet)")
-    print(f"  Invalid: {invalid} (bad/missing email)")
+    print(f"  Rows:    {counts['rows']}")
+    print(f"  Added:   {counts['added']}")
+    print(f"  Skipped: {counts['skipped']} (already stored or repeated in file)")
+    print(f"  Invalid: {counts['invalid']} (bad/missing email)")
+    print(f"  Bulk writes: {writer.requests}")
+    print(f"  Time:    {elapsed:.1f}s ({(counts['rows'] - resumed_at) / max(elapsed, 1e-9):.0f} rows/s)")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python tools/csv_importer.py <path/to/contacts.csv>")
-        sys.exit(1)
-
-    import_csv(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Import contacts from a CSV file into the contact list")
+    parser.add_argument("csv_path", help="CSV file with an email column (and optionally a name column)")
+    parser.add_argument(
+        "--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows per bulk append and checkpoint"
+    )
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint and start over")
+    args = parser.parse_args()
+
+    import_csv(args.csv_path, chunk_size=args.chunk_size, restart=args.restart)
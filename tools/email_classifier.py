@@ -3,11 +3,30 @@
 Classifies incoming emails as business leads vs noise for Crystal Seed Tarot.
 """
 
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import anthropic
 
-from config import BUSINESS_CONTEXT, CLASSIFICATION_CATEGORIES, get_anthropic_api_key
+from classification_cache import ClassificationCache
+from config import (
+    ANTHROPIC_POOL_SIZE,
+    ANTHROPIC_TIMEOUT,
+    BUSINESS_CONTEXT,
+    CLASSIFICATION_CATEGORIES,
+    CLASSIFY_BATCH_SIZE,
+    CLASSIFY_CONCURRENCY,
+    CLASSIFY_RATE_LIMIT_RETRIES,
+    CLASSIFY_REQUESTS_PER_MINUTE,
+    get_anthropic_api_key,
+)
+import metrics
+from llm_clients import get_anthropic_client, get_client
+
+MODEL = "claude-haiku-4-5-20251001"
 
 SYSTEM_PROMPT = f"""You are an email classifier for a tarot reading business.
 
@@ -49,6 +68,110 @@ Respond with JSON:
   "reason": "<brief explanation>"
 }}"""
 
+BATCH_USER_PROMPT_TEMPLATE = """Analyze each of the {count} emails below and determine, for each one, if the sender should be added to the business contact list.
+
+{emails}
+
+Respond with a JSON array containing exactly one object per email:
+[
+  {{
+    "id": <the email's id>,
+    "should_add": true/false,
+    "classification": "<category>",
+    "confidence": "high" | "medium" | "low",
+    "reason": "<brief explanation>"
+  }}
+]"""
+
+BATCH_ITEM_TEMPLATE = """<email id="{id}">
+From: {sender_name} <{sender_email}>
+Subject: {subject}
+Body preview:
+{snippet}
+</email>"""
+
+CONFIDENCE_LEVELS = ("high", "medium", "low")
+
+# Changes whenever the prompts or model do, invalidating cached classifications
+PROMPT_VERSION = hashlib.sha256(
+    "\n".join(
+        [MODEL, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, BATCH_USER_PROMPT_TEMPLATE, BATCH_ITEM_TEMPLATE]
+    ).encode()
+).hexdigest()[:12]
+
+# The static system prompt (instructions + BUSINESS_CONTEXT), marked for
+# prompt caching so repeat requests read it from cache instead of paying full
+# input price. The API silently skips caching below the model's minimum
+# cacheable length; the cache_* usage counters show whether it kicked in.
+SYSTEM_BLOCKS = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+# Token usage across every classification request in this process.
+# input_tokens counts only uncached input; cache reads/writes are separate.
+_usage = {
+    "requests": 0,
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "cache_creation_input_tokens": 0,
+}
+_usage_lock = threading.Lock()
+
+
+def get_usage() -> dict:
+    """Snapshot of the token usage recorded so far."""
+    with _usage_lock:
+        return dict(_usage)
+
+
+def _get_client() -> anthropic.Anthropic:
+    """Shared classifier client; the API key is only looked up on first use."""
+    return get_client(
+        "email_classifier",
+        lambda: get_anthropic_client(
+            get_anthropic_api_key(), timeout=ANTHROPIC_TIMEOUT, pool_size=ANTHROPIC_POOL_SIZE
+        ),
+    )
+
+
+def _complete(user_message: str, max_tokens: int) -> str:
+    """Send one classification request and return the reply text (code fences stripped)."""
+    with metrics.span("anthropic.messages.create"):
+        response = _get_client().messages.create(
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=SYSTEM_BLOCKS,
+            messages=[{"role": "user", "content": user_message}],
+        )
+
+    usage = response.usage
+    with _usage_lock:
+        _usage["requests"] += 1
+        _usage["input_tokens"] += usage.input_tokens
+        _usage["output_tokens"] += usage.output_tokens
+        _usage["cache_read_input_tokens"] += getattr(usage, "cache_read_input_tokens", 0) or 0
+        _usage["cache_creation_input_tokens"] += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+    text = response.content[0].text.strip()
+
+    # Handle potential markdown code blocks
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1]
+        text = text.rsplit("```", 1)[0]
+        text = text.strip()
+
+    return text
+
+
+def _prompt_fields(email: dict) -> dict:
+    """Template fields for one email, with placeholders for missing values."""
+    snippet = email.get("snippet")
+    return {
+        "sender_name": email.get("sender_name") or "(unknown)",
+        "sender_email": email["sender_email"],
+        "subject": email.get("subject") or "(no subject)",
+        "snippet": snippet[:500] if snippet else "(no body)",
+    }
+
 
 def classify_email(
     sender_name: str,
@@ -61,39 +184,182 @@ def classify_email(
     Returns:
         dict with keys: should_add, classification, confidence, reason
     """
-    client = anthropic.Anthropic(api_key=get_anthropic_api_key())
-
     user_message = USER_PROMPT_TEMPLATE.format(
-        sender_name=sender_name or "(unknown)",
-        sender_email=sender_email,
-        subject=subject or "(no subject)",
-        snippet=snippet[:500] if snippet else "(no body)",
-    )
-
-    response = client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=256,
-        system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_message}],
+        **_prompt_fields(
+            {
+                "sender_name": sender_name,
+                "sender_email": sender_email,
+                "subject": subject,
+                "snippet": snippet,
+            }
+        )
     )
 
     # Parse the JSON response
-    text = response.content[0].text.strip()
-
-    # Handle potential markdown code blocks
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1]
-        text = text.rsplit("```", 1)[0]
-        text = text.strip()
-
-    result = json.loads(text)
+    result = json.loads(_complete(user_message, max_tokens=256))
 
     # Validate the response
     if result.get("classification") not in CLASSIFICATION_CATEGORIES:
         result["classification"] = "general_interest"
-    if result.get("confidence") not in ("high", "medium", "low"):
+    if result.get("confidence") not in CONFIDENCE_LEVELS:
         result["confidence"] = "medium"
     result.setdefault("should_add", False)
     result.setdefault("reason", "")
 
     return result
+
+
+def _valid_batch_item(item) -> bool:
+    """Strict check for one entry of a batch reply; anything off gets re-sent alone."""
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("id"), int)
+        and isinstance(item.get("should_add"), bool)
+        and item.get("classification") in CLASSIFICATION_CATEGORIES
+        and item.get("confidence") in CONFIDENCE_LEVELS
+    )
+
+
+def classify_batch(emails: list[dict]) -> list[dict | None]:
+    """Classify several emails in a single request.
+
+    The system prompt and business context are sent once for the whole
+    batch. Each email gets a stable id (its position), and the JSON array
+    reply is validated item by item against CLASSIFICATION_CATEGORIES.
+
+    Returns one entry per email, in order: the classification dict, or None
+    if the reply left that email out or got it wrong (the caller should
+    re-send those individually).
+    """
+    items = "\n\n".join(
+        BATCH_ITEM_TEMPLATE.format(id=i, **_prompt_fields(email)) for i, email in enumerate(emails)
+    )
+    user_message = BATCH_USER_PROMPT_TEMPLATE.format(count=len(emails), emails=items)
+
+    try:
+        reply = json.loads(_complete(user_message, max_tokens=150 * len(emails) + 100))
+    except json.JSONDecodeError:
+        return [None] * len(emails)
+
+    results = [None] * len(emails)
+    for item in reply if isinstance(reply, list) else []:
+        if _valid_batch_item(item) and 0 <= item["id"] < len(emails) and results[item["id"]] is None:
+            results[item.pop("id")] = {"reason": "", **item}
+    return results
+
+
+def _retry_after(error: anthropic.RateLimitError) -> float:
+    """Seconds to back off after a 429, from the retry-after header if present."""
+    try:
+        return float(error.response.headers.get("retry-after", ""))
+    except ValueError:
+        return 10.0
+
+
+class _TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold back every worker for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+def classify_emails(
+    emails: list[dict],
+    concurrency: int = CLASSIFY_CONCURRENCY,
+    requests_per_minute: int = CLASSIFY_REQUESTS_PER_MINUTE,
+    cache: ClassificationCache | None = None,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    sent: list[int] | None = None,
+) -> list[dict | Exception]:
+    """Classify several emails concurrently.
+
+    Emails are packed `batch_size` to a request with classify_batch() (any
+    it leaves out are re-sent alone with classify_email()); batch_size=1
+    sends every email on its own. Up to `concurrency` requests run at once,
+    paced by a token bucket at `requests_per_minute`. A 429 pauses every
+    worker for the response's retry-after before the request is retried.
+    With a `cache`, emails it can answer never reach the LLM and fresh
+    results are stored.
+
+    Each email needs sender_name, sender_email, subject and snippet keys.
+    Returns one entry per email, in the same order: the classification dict,
+    or the exception that email failed with, so one failure doesn't affect
+    the rest. If `sent` is given, the indices of the emails that went to the
+    LLM (cache misses) are appended to it.
+    """
+    bucket = _TokenBucket(rate=requests_per_minute / 60, capacity=concurrency)
+
+    def _send(fn, *args):
+        for attempt in range(CLASSIFY_RATE_LIMIT_RETRIES + 1):
+            bucket.acquire()
+            try:
+                return fn(*args)
+            except anthropic.RateLimitError as e:
+                if attempt == CLASSIFY_RATE_LIMIT_RETRIES:
+                    return e
+                bucket.pause(_retry_after(e))
+            except Exception as e:
+                return e
+
+    def _classify_one(email: dict) -> dict | Exception:
+        return _send(
+            classify_email,
+            email["sender_name"],
+            email["sender_email"],
+            email["subject"],
+            email["snippet"],
+        )
+
+    def _classify_chunk(chunk: list[dict]) -> list[dict | Exception]:
+        if len(chunk) == 1:
+            return [_classify_one(chunk[0])]
+        batch_results = _send(classify_batch, chunk)
+        if isinstance(batch_results, Exception):
+            batch_results = [None] * len(chunk)
+        # Only the missing / malformed items are re-sent individually
+        return [
+            result if result is not None else _classify_one(email)
+            for email, result in zip(chunk, batch_results)
+        ]
+
+    results = [cache.get(email) if cache else None for email in emails]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if sent is not None:
+        sent.extend(misses)
+    if not misses:
+        return results
+
+    batch_size = max(1, batch_size)
+    chunks = [misses[i : i + batch_size] for i in range(0, len(misses), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        chunk_results = pool.map(_classify_chunk, [[emails[i] for i in chunk] for chunk in chunks])
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for i, result in zip(chunk, chunk_result):
+                results[i] = result
+                if cache and not isinstance(result, Exception):
+                    cache.put(emails[i], result)
+    return results
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Measure the local pre-classifier against a labeled corpus.
+
+Each corpus line is a JSON email dict (sender_name, sender_email, subject,
+snippet, and optionally labels / bulk / precedence / auto_submitted) with
+the expected "should_add". Emails the scanner's lead filter
+(is_lead_candidate) drops never reach the prefilter in a scan, so they
+are set aside first. For the rest it reports how many emails the rules
+decide, how many of those decisions are right, and which rules made any
+mistakes.
+
+Usage:
+    python tools/eval_prefilter.py
+    python tools/eval_prefilter.py --corpus path/to/labeled.jsonl
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+from gmail_scanner import is_lead_candidate
+from prefilter import preclassify
+
+DEFAULT_CORPUS = Path(__file__).parent / "fixtures" / "prefilter_corpus.jsonl"
+
+
+def _load(path: Path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local pre-classifier")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Labeled JSONL corpus")
+    parser.add_argument("-v", "--verbose", action="store_true", help="List every deferred email")
+    args = parser.parse_args()
+
+    labeled = _load(args.corpus)
+    corpus = [e for e in labeled if is_lead_candidate({"labels": [], "bulk": False, **e})]
+    decided = Counter()
+    wrong = Counter()
+    mistakes, deferred = [], []
+
+    for email in corpus:
+        verdict = preclassify(email)
+        if verdict is None:
+            deferred.append(email)
+            continue
+        decided[verdict["rule"]] += 1
+        if verdict["should_add"] != email["should_add"]:
+            wrong[verdict["rule"]] += 1
+            mistakes.append((email, verdict))
+
+    total = len(corpus)
+    n_decided = sum(decided.values())
+    n_correct = n_decided - len(mistakes)
+    print(f"\n{len(labeled)} labeled emails from {args.corpus.name}")
+    print(f"  Dropped by the lead filter before the prefilter: {len(labeled) - total}\n")
+    print(f"  Decided locally:  {n_decided} ({n_decided / total:.0%})")
+    print(f"  Deferred to LLM:  {len(deferred)} ({len(deferred) / total:.0%})")
+    if n_decided:
+        print(f"  Accuracy:         {n_correct}/{n_decided} ({n_correct / n_decided:.1%}) of local verdicts")
+
+    print(f"\n  {'rule':<18} {'decided':>7} {'wrong':>6}")
+    for rule, count in decided.most_common():
+        print(f"  {rule:<18} {count:>7} {wrong[rule]:>6}")
+
+    for email, verdict in mistakes:
+        print(f"\n  WRONG [{verdict['rule']}] {email['sender_email']}: {email['subject']!r}")
+        print(f"    expected should_add={email['should_add']}, got {verdict['should_add']}")
+
+    if args.verbose:
+        print()
+        for email in deferred:
+            print(f"  deferred: {email['sender_email']}: {email['subject']!r}")
+
+    sys.exit(1 if mistakes else 0)
+
+
+if __name__ == "__main__":
+    main()
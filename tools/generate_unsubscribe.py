@@ -1,23 +1,53 @@
 #!/usr/bin/env python3
-"""Generate an unsubscribe link for a given email address.
+"""Generate unsubscribe links for one email address or a whole mailing.
+
+With a single address it prints the link. With --file, --stdin or
+--from-store it streams one row per address (email, token, link) as CSV
+or JSONL, keying HMAC once and reading .env.local once for the whole run.
+--from-store uses each contact's stored Unsubscribe Token where it has one,
+and with a local contact backend merges in the Sheet's unsubscribes first.
 
 Usage:
     python tools/generate_unsubscribe.py someone@example.com
+    python tools/generate_unsubscribe.py --file addresses.txt > links.csv
+    cat addresses.txt | python tools/generate_unsubscribe.py --stdin --format jsonl
+    python tools/generate_unsubscribe.py --from-store --workers 4 -o links.csv
 """
 
+import argparse
+import csv
 import hashlib
 import hmac
+import itertools
+import json
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+from config import CONTACT_BACKEND, get_site_url, get_unsubscribe_secret
+
+CHUNK_SIZE = 10_000  # addresses per worker task with --workers
+
+
+def token_signer(secret: str) -> Callable[[str], str]:
+    """Return a function email -> token, keying HMAC-SHA256 with `secret` once.
 
-from config import get_site_url, get_unsubscribe_secret
+    Each call copies the keyed object rather than re-deriving the key pads.
+    """
+    keyed = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    def sign(email: str) -> str:
+        mac = keyed.copy()
+        mac.update(email.lower().encode())
+        return mac.hexdigest()
+
+    return sign
 
 
 def generate_token(email: str) -> str:
     """Generate an HMAC-SHA256 token for the given email."""
-    secret = get_unsubscribe_secret()
-    return hmac.new(
-        secret.encode(), email.lower().encode(), hashlib.sha256
-    ).hexdigest()
+    return token_signer(get_unsubscribe_secret())(email)
 
 
 def generate_link(email: str) -> str:
@@ -27,14 +57,137 @@ def generate_link(email: str) -> str:
     return f"{site_url}/api/unsubscribe?token={token}"
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python tools/generate_unsubscribe.py <email@example.com>")
-        sys.exit(1)
+def _links(emails: list[str | tuple[str, str]], secret: str, site_url: str) -> list[tuple[str, str, str]]:
+    """(email, token, link) for each address. Module-level so worker processes can run it."""
+    sign = token_signer(secret)
+    rows = []
+    for item in emails:
+        email, token = item if isinstance(item, tuple) else (item, "")
+        token = token or sign(email)
+        rows.append((email, token, f"{site_url}/api/unsubscribe?token={token}"))
+    return rows
+
+
+def _chunks(emails: Iterable[str | tuple[str, str]], size: int) -> Iterator[list[str | tuple[str, str]]]:
+    emails = iter(emails)
+    while chunk := list(itertools.islice(emails, size)):
+        yield chunk
+
+
+def generate_links(
+    emails: Iterable[str | tuple[str, str]], workers: int = 1
+) -> Iterator[tuple[str, str, str]]:
+    """Stream (email, token, link) in input order, optionally across worker processes.
+
+    An item may be an (email, token) pair to use a token the contact list
+    already holds; an address on its own, or a blank token, is signed.
+    """
+    secret = get_unsubscribe_secret()
+    site_url = get_site_url().rstrip("/")
+    chunks = _chunks(emails, CHUNK_SIZE)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _links(chunk, secret, site_url)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep at most two chunks per worker in flight so huge inputs stream
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_links, chunk, secret, site_url))
+            if len(pending) >= workers * 2:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
 
-    email = sys.argv[1]
-    link = generate_link(email)
 
-    print(f"\nUnsubscribe link for {email}:")
-    print(f"  {link}")
-    print(f"\nPaste this at the bottom of your emails to that contact.")
+def _read_addresses(lines: Iterable[str]) -> Iterator[str]:
+    """One address per line; blank lines and # comments are skipped."""
+    for line in lines:
+        email = line.strip()
+        if email and not email.startswith("#"):
+            yield email
+
+
+def _store_addresses() -> Iterator[tuple[str, str]]:
+    """(email, token) for active contacts from the configured contact backend.
+
+    The stored token is what /api/unsubscribe looks up, and rows copied in
+    from elsewhere may carry one that isn't this secret's HMAC, so it wins
+    over a freshly signed one whenever it's set. Link unsubscribes only
+    reach the Sheet, so a local backend first takes the Sheet's
+    unsubscribes; without Sheets credentials this refuses to run.
+    """
+    # Google client libraries, only needed here
+    from contacts import get_store, is_active, load_credentials, merge_unsubscribes, open_store
+
+    creds = load_credentials()
+    store = get_store(creds)
+    if CONTACT_BACKEND != "sheets":
+        merged = merge_unsubscribes(open_store("sheets", creds), store)
+        print(f"Merged {merged} unsubscribes from the Sheet into the {CONTACT_BACKEND} store.", file=sys.stderr)
+    for contact in store.contacts(["Email", "Status", "Unsubscribe Token"]):
+        if contact["Email"] and is_active(contact["Status"]):
+            yield contact["Email"], contact["Unsubscribe Token"]
+
+
+def _write(rows: Iterable[tuple[str, str, str]], out, fmt: str) -> int:
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["email", "token", "link"])
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(row)
+    else:
+        for count, (email, token, link) in enumerate(rows, start=1):
+            out.write(json.dumps({"email": email, "token": token, "link": link}) + "\n")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate unsubscribe links")
+    parser.add_argument("email", nargs="?", help="A single address to print the link for")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="Read addresses from a file, one per line")
+    source.add_argument("--stdin", action="store_true", help="Read addresses from stdin, one per line")
+    source.add_argument("--from-store", action="store_true", help="Use every active contact in the contact list")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("-o", "--output", help="Write here instead of stdout")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, for very large lists")
+    args = parser.parse_args()
+
+    bulk = args.file or args.stdin or args.from_store
+    if bool(args.email) == bool(bulk):
+        parser.error("give one email address, or one of --file / --stdin / --from-store")
+
+    if args.email:
+        link = generate_link(args.email)
+        print(f"\nUnsubscribe link for {args.email}:")
+        print(f"  {link}")
+        print(f"\nPaste this at the bottom of your emails to that contact.")
+        return
+
+    in_file = open(args.file, encoding="utf-8") if args.file else None
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.from_store:
+            emails = _store_addresses()
+        else:
+            emails = _read_addresses(in_file or sys.stdin)
+
+        start = time.perf_counter()
+        count = _write(generate_links(emails, args.workers), out, args.format)
+        elapsed = time.perf_counter() - start
+    finally:
+        if in_file:
+            in_file.close()
+        if args.output:
+            out.close()
+
+    # stdout may be the links themselves, so report on stderr
+    rate = count / elapsed if elapsed else 0
+    print(f"{count} links in {elapsed:.2f}s ({rate:,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,74 @@
 """Gmail API integration — fetch and search emails for business contacts."""
 
 import base64
+import html
+import itertools
 import json
+import queue
 import re
-from datetime import datetime, timezone
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
 from email.utils import parseaddr
 
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from config import (
+    DATA_DIR,
+    GMAIL_BATCH_RETRIES,
+    GMAIL_FAILED_FETCH_RUNS,
+    GMAIL_BATCH_SIZE,
+    GMAIL_EXCLUDE_LABELS,
+    GMAIL_EXCLUDE_QUERY_PARTS,
+    GMAIL_EXCLUDE_SENDERS,
+    LAST_SCAN_FILE,
+    PROCESSED_ID_GRACE_DAYS,
+)
+import metrics
+from processed_store import ProcessedIdStore
+
+# Per-item errors worth retrying in a later batch (rate limits, transient 5xx)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# How much of an HTML-only body to decode when looking for snippet text
+HTML_PREFIX_BYTES = 64 * 1024
+
+# Headers requested in the first, metadata-only fetch phase
+METADATA_HEADERS = ["From", "Subject", "List-Unsubscribe", "Precedence", "Auto-Submitted"]
+
+UNSUBSCRIBE_PATTERNS = re.compile(
+    r"\b(unsubscribe|remove me|stop emailing|opt out|take me off|"
+    r"don'?t (want|need) (any ?more|these) emails?|"
+    r"please remove|no longer wish|stop sending)\b",
+    re.IGNORECASE,
+)
+
 
-from config import DATA_DIR, GMAIL_EXCLUDE_QUERY_PARTS, LAST_SCAN_FILE
+_services = threading.local()  # per thread: (creds, Gmail service built with them)
 
 
 def _get_service(creds: Credentials):
-    """Build the Gmail API service."""
-    return build("gmail", "v1", credentials=creds)
+    """The Gmail API service for `creds`, built once per thread.
+
+    A service's HTTP connection mustn't be shared between threads, but each
+    thread (say, a run_scan route worker) reuses its own across pages.
+    """
+    cached = getattr(_services, "gmail", None)
+    if cached is None or cached[0] is not creds:
+        cached = _services.gmail = (creds, build("gmail", "v1", credentials=creds))
+    return cached[1]
 
 
 def _load_scan_state() -> dict:
-    """Load last scan state (timestamp + processed IDs)."""
+    """Load last scan state (timestamp, history ID, page cursor, failed fetches)."""
     if LAST_SCAN_FILE.exists():
         with open(LAST_SCAN_FILE) as f:
             return json.load(f)
-    return {"last_scan": None, "processed_ids": []}
+    return {"last_scan": None}
 
 
 def _save_scan_state(state: dict):
@@ -33,10 +79,10 @@ def _save_scan_state(state: dict):
 
 
 def _build_query(after_date: str | None = None) -> str:
-    """Build a Gmail search query that excludes noise."""
+    """Build the Gmail search query shared by the lead and unsubscribe stages."""
     parts = ["in:inbox"]
 
-    # Exclude noise categories and senders
+    # Exclude automated senders
     for exclude in GMAIL_EXCLUDE_QUERY_PARTS:
         parts.append(f"-{exclude}")
 
@@ -47,6 +93,19 @@ def _build_query(after_date: str | None = None) -> str:
     return " ".join(parts)
 
 
+def _has_header(headers: list[dict], name: str) -> bool:
+    """Check whether a header is present (case-insensitive)."""
+    return any(h["name"].lower() == name.lower() for h in headers)
+
+
+def _header_value(headers: list[dict], name: str) -> str:
+    """Return a header's value, lower-cased and stripped, or "" if absent."""
+    for header in headers:
+        if header["name"].lower() == name.lower():
+            return header["value"].strip().lower()
+    return ""
+
+
 def _extract_sender(headers: list[dict]) -> tuple[str, str]:
     """Extract sender name and email from message headers."""
     for header in headers:
@@ -64,171 +123,512 @@ def _extract_subject(headers: list[dict]) -> str:
     return ""
 
 
-def _extract_body_snippet(payload: dict, max_chars: int = 500) -> str:
-    """Extract a text snippet from the email body."""
-    # Try to get plain text body
-    if payload.get("mimeType") == "text/plain" and payload.get("body", {}).get("data"):
-        text = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="replace")
-        return text[:max_chars]
-
-    # Check parts for text/plain
-    for part in payload.get("parts", []):
-        if part.get("mimeType") == "text/plain" and part.get("body", {}).get("data"):
-            text = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="replace")
-            return text[:max_chars]
-
-        # Nested multipart
-        for subpart in part.get("parts", []):
-            if subpart.get("mimeType") == "text/plain" and subpart.get("body", {}).get("data"):
-                text = base64.urlsafe_b64decode(subpart["body"]["data"]).decode("utf-8", errors="replace")
-                return text[:max_chars]
+def _decode_prefix(data: str, max_bytes: int) -> bytes:
+    """Decode just enough of a base64url body to cover the first `max_bytes`."""
+    # Every 4 base64 chars decode to 3 bytes
+    chunk = data[: -(-max_bytes // 3) * 4]
+    return base64.urlsafe_b64decode(chunk + "=" * (-len(chunk) % 4))
+
+
+def _is_attachment(part: dict) -> bool:
+    """Attachments have a filename or keep their data behind an attachmentId."""
+    if part.get("filename") or part.get("body", {}).get("attachmentId"):
+        return True
+    for header in part.get("headers", []):
+        if header["name"].lower() == "content-disposition":
+            return header["value"].lower().startswith("attachment")
+    return False
 
-    return ""
 
+HTML_DROP_BLOCKS = re.compile(r"<(script|style|head)\b.*?(?:</\1\s*>|$)", re.IGNORECASE | re.DOTALL)
+HTML_TAGS = re.compile(r"<[^>]*>?")
+WHITESPACE = re.compile(r"\s+")
 
-def scan_emails(creds: Credentials, max_results: int = 100) -> list[dict]:
-    """Scan Gmail for new emails since last scan.
 
-    Returns a list of dicts with:
-        - id: message ID
-        - sender_email: sender's email address
-        - sender_name: sender's display name
-        - subject: email subject
-        - snippet: body text snippet (first 500 chars)
-        - date: email date
+def _html_to_text(markup: str) -> str:
+    """Cheap HTML → text: drop script/style/head blocks and tags, unescape entities."""
+    text = HTML_DROP_BLOCKS.sub(" ", markup)
+    text = HTML_TAGS.sub(" ", text)
+    return WHITESPACE.sub(" ", html.unescape(text)).strip()
+
+
+def _extract_body_snippet(payload: dict, max_chars: int = 500) -> str:
+    """Extract a text snippet from the email body.
+
+    Walks the MIME tree iteratively (any depth) and returns the first
+    text/plain part, falling back to the first text/html part with tags
+    stripped. Attachments are skipped without being decoded, and only the
+    prefix of a body needed for `max_chars` is base64-decoded.
     """
-    service = _get_service(creds)
-    state = _load_scan_state()
+    html_part = None
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if part.get("parts"):
+            # Reversed so parts are visited in document order
+            stack.extend(reversed(part["parts"]))
+            continue
+        if _is_attachment(part) or not part.get("body", {}).get("data"):
+            continue
 
-    processed_ids = set(state.get("processed_ids", []))
-    after_date = state.get("last_scan")
+        mime_type = part.get("mimeType", "")
+        if mime_type == "text/plain":
+            # UTF-8 is at most 4 bytes per character
+            raw = _decode_prefix(part["body"]["data"], max_chars * 4)
+            return raw.decode("utf-8", errors="replace")[:max_chars]
+        if mime_type == "text/html" and html_part is None:
+            html_part = part
 
-    query = _build_query(after_date)
-    print(f"Gmail query: {query}")
+    if html_part is not None:
+        # Markup (inline styles especially) dwarfs the text, so decode more
+        raw = _decode_prefix(html_part["body"]["data"], HTML_PREFIX_BYTES)
+        return _html_to_text(raw.decode("utf-8", errors="replace"))[:max_chars]
 
-    # Fetch message IDs
-    results = (
-        service.users()
-        .messages()
-        .list(userId="me", q=query, maxResults=max_results)
-        .execute()
-    )
+    return ""
 
-    messages = results.get("messages", [])
-    if not messages:
-        print("No new emails found.")
-        return []
 
-    print(f"Found {len(messages)} emails to process.")
+def _fetch_messages(
+    service,
+    msg_ids: list[str],
+    msg_format: str = "full",
+    batch_size: int = GMAIL_BATCH_SIZE,
+) -> tuple[list[dict], list[str]]:
+    """Fetch messages using HTTP batch requests, `batch_size` gets per round trip.
 
-    new_emails = []
-    for msg_ref in messages:
-        msg_id = msg_ref["id"]
-        if msg_id in processed_ids:
-            continue
+    Errors are handled per message: rate-limited or transient failures are
+    retried in a later batch, anything else is logged and skipped so one bad
+    message never fails the whole batch. Returns the fetched messages in the
+    same order as `msg_ids`, and the IDs that still failed, so the caller
+    can try them again later. Messages that no longer exist (404) are
+    dropped rather than reported as failed.
+
+    With msg_format="metadata" only METADATA_HEADERS and Gmail's own snippet
+    are returned, not the MIME tree.
+    """
+    get_kwargs = {"userId": "me", "format": msg_format}
+    if msg_format == "metadata":
+        get_kwargs["metadataHeaders"] = METADATA_HEADERS
+
+    fetched = {}
+    retry_ids = []
+    failed_ids = []
+
+    def _on_response(request_id, response, exception):
+        if exception is None:
+            fetched[request_id] = response
+        elif isinstance(exception, HttpError) and exception.resp.status in RETRYABLE_STATUSES:
+            retry_ids.append(request_id)
+        elif isinstance(exception, HttpError) and exception.resp.status == 404:
+            print(f"  Skipping message {request_id}: it no longer exists")
+        else:
+            print(f"  Skipping message {request_id}: {exception}")
+            failed_ids.append(request_id)
+
+    pending = list(msg_ids)
+    for attempt in range(GMAIL_BATCH_RETRIES + 1):
+        for start in range(0, len(pending), batch_size):
+            batch = service.new_batch_http_request(callback=_on_response)
+            for msg_id in pending[start : start + batch_size]:
+                batch.add(
+                    service.users().messages().get(id=msg_id, **get_kwargs),
+                    request_id=msg_id,
+                )
+            with metrics.span(f"gmail.batch.{msg_format}"):
+                batch.execute()
+            metrics.count(f"gmail.messages.get.{msg_format}", len(pending[start : start + batch_size]))
+
+        if not retry_ids:
+            break
+        if attempt == GMAIL_BATCH_RETRIES:
+            print(f"  Giving up on {len(retry_ids)} messages after {attempt + 1} attempts.")
+            failed_ids.extend(retry_ids)
+            break
+
+        # Exponential backoff before re-sending only the failed items
+        pending = list(retry_ids)
+        retry_ids.clear()
+        time.sleep(2**attempt)
+
+    return [fetched[msg_id] for msg_id in msg_ids if msg_id in fetched], failed_ids
+
+
+def _parse_message(msg: dict) -> dict:
+    """Turn a Gmail message resource into the email dict used by the scanners.
+
+    For metadata-only messages there is no body to extract, so the snippet
+    is Gmail's own (~200 char) preview until load_bodies() fills it in.
+    """
+    payload = msg.get("payload", {})
+    headers = payload.get("headers", [])
+    sender_name, sender_email = _extract_sender(headers)
+    snippet = _extract_body_snippet(payload)
+
+    # Use Gmail's snippet as fallback
+    if not snippet:
+        snippet = msg.get("snippet", "")
+
+    return {
+        "id": msg["id"],
+        "sender_email": sender_email,
+        "sender_name": sender_name,
+        "subject": _extract_subject(headers),
+        "snippet": snippet,
+        "date": msg.get("internalDate", ""),
+        "size_estimate": msg.get("sizeEstimate", 0),
+        "labels": msg.get("labelIds", []),
+        "bulk": _has_header(headers, "List-Unsubscribe"),
+        "precedence": _header_value(headers, "Precedence"),
+        "auto_submitted": _header_value(headers, "Auto-Submitted"),
+    }
+
+
+def load_bodies(
+    creds: Credentials,
+    emails: list[dict],
+    batch_size: int = GMAIL_BATCH_SIZE,
+) -> list[dict]:
+    """Second fetch phase: download full bodies for emails that need them.
+
+    Replaces each email's snippet with the first 500 chars of its body, in
+    place. Emails whose full fetch fails keep Gmail's preview snippet.
+    Returns `emails` for convenience.
+    """
+    if not emails:
+        return emails
 
-        # Fetch full message
-        msg = (
-            service.users()
-            .messages()
-            .get(userId="me", id=msg_id, format="full")
-            .execute()
-        )
-
-        headers = msg.get("payload", {}).get("headers", [])
-        sender_name, sender_email = _extract_sender(headers)
-        subject = _extract_subject(headers)
+    service = _get_service(creds)
+    by_id = {e["id"]: e for e in emails}
+    messages, _ = _fetch_messages(service, list(by_id), batch_size=batch_size)
+    for msg in messages:
         snippet = _extract_body_snippet(msg.get("payload", {}))
+        if snippet:
+            by_id[msg["id"]]["snippet"] = snippet
+    return emails
+
+
+def _list_message_pages(service, query: str, page_size: int, page_token: str | None = None):
+    """Yield (message_ids, next_page_token) for each page of a messages().list query."""
+    while True:
+        with metrics.span("gmail.messages.list"):
+            results = (
+                service.users()
+                .messages()
+                .list(userId="me", q=query, maxResults=page_size, pageToken=page_token)
+                .execute()
+            )
+        page_token = results.get("nextPageToken")
+        yield [m["id"] for m in results.get("messages", [])], page_token
+        if not page_token:
+            return
 
-        # Use Gmail's snippet as fallback
-        if not snippet:
-            snippet = msg.get("snippet", "")
-
-        new_emails.append(
-            {
-                "id": msg_id,
-                "sender_email": sender_email,
-                "sender_name": sender_name,
-                "subject": subject,
-                "snippet": snippet,
-                "date": msg.get("internalDate", ""),
-            }
-        )
 
-        processed_ids.add(msg_id)
+def _list_history_pages(service, start_history_id: str, page_token: str | None = None):
+    """Yield (message_ids, next_page_token) for inbox messages added since a history ID.
 
-    # Update scan state
-    state["last_scan"] = datetime.now(timezone.utc).strftime("%Y/%m/%d")
-    state["processed_ids"] = list(processed_ids)
-    _save_scan_state(state)
+    Raises HttpError 404 when start_history_id is too old to sync from.
+    """
+    while True:
+        with metrics.span("gmail.history.list"):
+            results = (
+                service.users()
+                .history()
+                .list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    historyTypes=["messageAdded"],
+                    labelId="INBOX",
+                    pageToken=page_token,
+                )
+                .execute()
+            )
+        page_token = results.get("nextPageToken")
 
-    print(f"Processed {len(new_emails)} new emails.")
-    return new_emails
+        msg_ids = [
+            added["message"]["id"]
+            for record in results.get("history", [])
+            for added in record.get("messagesAdded", [])
+        ]
 
+        # A message can show up in several history records
+        yield list(dict.fromkeys(msg_ids)), page_token
+        if not page_token:
+            return
+
+
+def _is_excluded_sender(email: dict) -> bool:
+    """Check the sender against GMAIL_EXCLUDE_SENDERS."""
+    sender = email["sender_email"]
+    return any(excluded in sender for excluded in GMAIL_EXCLUDE_SENDERS)
 
-UNSUBSCRIBE_PATTERNS = re.compile(
-    r"\b(unsubscribe|remove me|stop emailing|opt out|take me off|"
-    r"don'?t (want|need) (any ?more|these) emails?|"
-    r"please remove|no longer wish|stop sending)\b",
-    re.IGNORECASE,
-)
 
+def _is_own_email(email: dict) -> bool:
+    """Emails FROM Holly (outgoing)."""
+    return "crystalseedtarot" in email["sender_email"] or "hollymcole" in email["sender_email"]
 
-def scan_for_unsubscribes(creds: Credentials, max_results: int = 50) -> list[dict]:
-    """Scan Gmail for incoming emails that look like unsubscribe requests.
 
-    Returns a list of dicts with sender_email, sender_name, subject, snippet.
+def is_lead_candidate(email: dict) -> bool:
+    """Lead-stage filter: skip category tabs and mass mail.
+
+    Mass mail is anything with a List-Unsubscribe header or "unsubscribe" in
+    the subject / snippet, which stands in for the old "-unsubscribe"
+    full-text search term.
+    """
+    if set(email["labels"]) & GMAIL_EXCLUDE_LABELS or email["bulk"]:
+        return False
+    return "unsubscribe" not in f"{email['subject']} {email['snippet']}".lower()
+
+
+def is_unsubscribe_request(email: dict) -> bool:
+    """Unsubscribe-stage filter: someone asking to be taken off the list."""
+    if _is_own_email(email):
+        return False
+    return bool(UNSUBSCRIBE_PATTERNS.search(f"{email['subject']} {email['snippet']}"))
+
+
+def _current_history_id(service) -> str:
+    """Return the mailbox's current history ID."""
+    with metrics.span("gmail.getProfile"):
+        return service.users().getProfile(userId="me").execute()["historyId"]
+
+
+def iter_email_pages(
+    creds: Credentials,
+    page_size: int = 100,
+    batch_size: int = GMAIL_BATCH_SIZE,
+    acks: queue.Queue | None = None,
+) -> Iterator[list[dict]]:
+    """Yield new emails since the last scan, one page of results at a time.
+
+    Once a scan has completed, later runs sync incrementally: the mailbox
+    historyId saved in the scan state is handed to history.list, which
+    returns only messages added since then. If that ID has expired (or
+    there isn't one yet) the date-based search query is used instead.
+
+    Either way, pages are followed until exhausted. After each page has
+    been consumed the processed IDs and a resumable page cursor are saved;
+    an interrupted scan picks up from that cursor on the next run.
+    `last_scan` and the history ID only move forward once every page has
+    been read.
+
+    A page counts as consumed when the caller asks for the next one. A
+    caller that finishes pages later, on other threads, passes `acks`
+    instead: it puts one item on the queue per finished page, in the order
+    they were yielded, or None to abandon the scan (nothing further is
+    saved). Pages are then checkpointed only once acked, so the generator
+    can run ahead without marking unfinished pages processed.
+
+    Messages are fetched metadata-only (headers plus Gmail's preview
+    snippet) and senders in GMAIL_EXCLUDE_SENDERS are dropped. Each message
+    is listed and fetched once for both the lead and unsubscribe stages;
+    see route_page().
     """
+    with ProcessedIdStore() as processed_ids:
+        yield from _iter_new_pages(creds, processed_ids, page_size, batch_size, acks)
+
+
+def _iter_new_pages(
+    creds: Credentials,
+    processed_ids: ProcessedIdStore,
+    page_size: int,
+    batch_size: int,
+    acks: queue.Queue | None,
+) -> Iterator[list[dict]]:
+    """Body of iter_email_pages(), run with the processed-ID store open."""
     service = _get_service(creds)
     state = _load_scan_state()
-    after_date = state.get("last_scan")
 
-    # Search for emails containing unsubscribe-like language
-    query = "in:inbox {unsubscribe remove opt-out}"
-    if after_date:
-        query += f" after:{after_date}"
-
-    results = (
-        service.users()
-        .messages()
-        .list(userId="me", q=query, maxResults=max_results)
-        .execute()
-    )
-
-    messages = results.get("messages", [])
-    if not messages:
-        return []
-
-    unsubscribes = []
-    for msg_ref in messages:
-        msg = (
-            service.users()
-            .messages()
-            .get(userId="me", id=msg_ref["id"], format="full")
-            .execute()
-        )
-
-        headers = msg.get("payload", {}).get("headers", [])
-        sender_name, sender_email = _extract_sender(headers)
-        subject = _extract_subject(headers)
-        snippet = _extract_body_snippet(msg.get("payload", {}))
-        if not snippet:
-            snippet = msg.get("snippet", "")
+    if processed_ids.migrate(state):
+        _save_scan_state(state)
+    cursor = state.get("cursor")
+
+    if cursor:
+        mode = cursor.get("mode", "query")
+        page_token = cursor["page_token"]
+        started = cursor["started"]
+        new_history_id = cursor.get("history_id")
+        print(f"Resuming interrupted scan started {started}.")
+    else:
+        mode = "history" if state.get("history_id") else "query"
+        page_token = None
+        started = datetime.now(timezone.utc).strftime("%Y/%m/%d")
+        # Taken before listing so anything arriving mid-scan is picked up next run
+        new_history_id = _current_history_id(service)
+
+    # Each page's listing and metadata fetch is timed as one "stage.fetch_page"
+    # call, leaving out the time the caller holds the page
+    page_started = time.perf_counter()
+    if mode == "history":
+        start_history_id = cursor["start_history_id"] if cursor else state["history_id"]
+        print(f"Incremental sync from history ID {start_history_id}")
+        pages = _list_history_pages(service, start_history_id, page_token)
+        try:
+            pages = itertools.chain([next(pages)], pages)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            print("History ID has expired, falling back to a full query scan.")
+            mode, page_token = "query", None
+
+    if mode == "query":
+        query = cursor["query"] if cursor and cursor.get("query") else _build_query(state.get("last_scan"))
+        print(f"Gmail query: {query}")
+        pages = _list_message_pages(service, query, page_size, page_token)
+
+    # Messages whose fetch failed last run: listing has moved past them, so
+    # they go out first as a page of their own, with no cursor to save
+    retries = state.get("failed_ids", {})  # message ID -> runs it has failed in
+    failed: dict[str, int] = {}
+    if retries:
+        print(f"Retrying {len(retries)} messages that failed to fetch last run.")
+        pages = itertools.chain([(list(retries), None)], pages)
+
+    def _checkpoint(page: list[dict], next_token: str | None):
+        """Mark a finished page processed and save the cursor past it."""
+        for email in page:
+            processed_ids.add(email["id"])
+            in_flight.discard(email["id"])
+        if next_token:
+            state["cursor"] = {
+                "mode": mode,
+                "page_token": next_token,
+                "started": started,
+                "history_id": new_history_id,
+            }
+            if mode == "history":
+                state["cursor"]["start_history_id"] = start_history_id
+            else:
+                state["cursor"]["query"] = query
+            _save_failed()
+            processed_ids.commit()
+            _save_scan_state(state)
+
+    def _save_failed():
+        """Keep this run's failed fetches in `state` for the next run to retry."""
+        if failed:
+            state["failed_ids"] = dict(failed)
+        else:
+            state.pop("failed_ids", None)
+
+    def _settle(wait: bool) -> bool:
+        """Run the checkpoints of pages the caller has finished, in page order.
+
+        With wait, blocks on `acks` until every checkpoint has run. Returns
+        False if the caller abandoned the scan.
+        """
+        nonlocal acked
+        while pending:
+            index, page, next_token = pending[0]
+            if index is not None and index >= acked:
+                try:
+                    if acks.get(block=wait) is None:
+                        return False
+                except queue.Empty:
+                    return True
+                acked += 1
+                continue
+            pending.popleft()
+            _checkpoint(page, next_token)
+        return True
+
+    total = 0
+    yielded = acked = 0
+    # (index of the yielded page or None if nothing was yielded, page, next_token)
+    pending: deque[tuple[int | None, list[dict], str | None]] = deque()
+    in_flight: set[str] = set()  # yielded but not yet checkpointed
+    try:
+        for page_num, (msg_ids, next_token) in enumerate(pages, start=1):
+            new_ids = [i for i in msg_ids if i not in processed_ids and i not in in_flight]
+            print(f"Page {page_num}: {len(msg_ids)} emails, {len(new_ids)} new.")
+
+            page = []
+            messages, failed_ids = _fetch_messages(service, new_ids, "metadata", batch_size)
+            for msg_id in failed_ids:
+                runs = retries.get(msg_id, 0) + 1
+                if runs < GMAIL_FAILED_FETCH_RUNS:
+                    failed[msg_id] = runs
+                else:
+                    print(f"  Dropping message {msg_id}: failed to fetch in {runs} scans.")
+            for msg in messages:
+                email = _parse_message(msg)
+                if _is_excluded_sender(email):
+                    processed_ids.add(msg["id"])
+                    continue
+                page.append(email)
+            metrics.record("stage.fetch_page", time.perf_counter() - page_started)
+
+            index = None
+            if page:
+                index = yielded
+                in_flight.update(email["id"] for email in page)
+                yield page
+                yielded += 1
+                if acks is None:
+                    acked += 1  # asking for the next page means this one is done
+            total += len(page)
+
+            pending.append((index, page, next_token))
+            if not _settle(wait=False):
+                return
+            page_started = time.perf_counter()
+    except HttpError as e:
+        # Page tokens are opaque and can go stale; start the scan over next run
+        if cursor and e.resp.status in (400, 404):
+            print("Saved page cursor is no longer valid, restarting the scan next run.")
+            state.pop("cursor", None)
+            _save_scan_state(state)
+        raise
+
+    if not _settle(wait=True):
+        return
+
+    # Every page read — advance the scan window to when this scan began
+    state.pop("cursor", None)
+    state["last_scan"] = started
+    state["history_id"] = new_history_id
+    _save_failed()
+    processed_ids.commit()
+    _save_scan_state(state)
 
-        # Skip emails FROM Holly (outgoing)
-        if "crystalseedtarot" in sender_email or "hollymcole" in sender_email:
-            continue
+    # IDs seen before the next run's after: window can never be listed again
+    window_start = datetime.strptime(started, "%Y/%m/%d").replace(tzinfo=timezone.utc)
+    processed_ids.prune(before=(window_start - timedelta(days=PROCESSED_ID_GRACE_DAYS)).timestamp())
 
-        # Check if the subject or body actually matches unsubscribe intent
-        text = f"{subject} {snippet}"
-        if UNSUBSCRIBE_PATTERNS.search(text):
-            unsubscribes.append(
-                {
-                    "sender_email": sender_email,
-                    "sender_name": sender_name,
-                    "subject": subject,
-                    "snippet": snippet[:200],
-                }
-            )
+    print(f"Processed {total} new emails.")
 
-    return unsubscribes
+
+def route_page(
+    creds: Credentials,
+    page: list[dict],
+    known_senders: set[str],
+    batch_size: int = GMAIL_BATCH_SIZE,
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """Send one page of metadata-only emails through both scan stages.
+
+    Senders not yet in `known_senders` go to the lead stage; known senders
+    go to the unsubscribe stage (nobody else can be unsubscribed). Bodies
+    are downloaded in one batch for just the emails that need them: lead
+    candidates, plus contacts' emails whose subject/preview doesn't already
+    match UNSUBSCRIBE_PATTERNS, since the preview is only the first couple
+    of hundred characters and a request can sit further down.
+
+    Returns (leads, unsubscribes, skipped) — skipped emails never had their
+    body downloaded.
+    """
+    leads, maybe_unsubscribes = [], []
+    for email in page:
+        if email["sender_email"] in known_senders:
+            if not _is_own_email(email):
+                maybe_unsubscribes.append(email)
+        elif is_lead_candidate(email):
+            leads.append(email)
+
+    undecided = [e for e in maybe_unsubscribes if not is_unsubscribe_request(e)]
+    load_bodies(creds, leads + undecided, batch_size=batch_size)
+
+    loaded_ids = {e["id"] for e in leads + undecided}
+    skipped = [e for e in page if e["id"] not in loaded_ids]
+
+    # Re-check leads now the body is known, as the "-unsubscribe" query term did
+    leads = [e for e in leads if is_lead_candidate(e)]
+    unsubscribes = [e for e in maybe_unsubscribes if is_unsubscribe_request(e)]
+    return leads, unsubscribes, skipped
@@ -2,7 +2,6 @@
 
 import google.generativeai as genai
 from openai import OpenAI, AzureOpenAI
-from anthropic import Anthropic
 import argparse
 import os
 from dotenv import load_dotenv
@@ -12,6 +11,11 @@ import base64
 from typing import Optional, Union, List
 import mimetypes
 
+try:
+    from llm_clients import get_anthropic_client
+except ImportError:  # imported as tools.llm_api from the project root
+    from tools.llm_clients import get_anthropic_client
+
 def load_environment():
     """Load environment variables from .env files in order of precedence"""
     # Order of precedence:
@@ -102,9 +106,8 @@ def create_llm_client(provider="openai"):
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        return Anthropic(
-            api_key=api_key
-        )
+        # Shared, pooled client (also used by email_classifier)
+        return get_anthropic_client(api_key)
     elif provider == "gemini":
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
@@ -0,0 +1,66 @@
+"""Process-wide registry of LLM API clients.
+
+Building an SDK client per request means a fresh connection pool, and so a
+fresh TLS handshake, for every call. Clients here are built lazily on first
+use and then shared by every caller and thread in the process, so repeat
+requests go out over warm keep-alive connections.
+"""
+
+import hashlib
+import threading
+from collections.abc import Callable
+from typing import TypeVar
+
+import anthropic
+import httpx
+
+DEFAULT_TIMEOUT = 60.0  # seconds
+DEFAULT_POOL_SIZE = 10  # max keep-alive connections per client
+
+T = TypeVar("T")
+
+_clients: dict[str, object] = {}
+_lock = threading.RLock()  # factories may register clients of their own
+
+
+def get_client(key: str, factory: Callable[[], T]) -> T:
+    """Return the client registered under `key`, building it with `factory` once."""
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+    return client
+
+
+def get_anthropic_client(
+    api_key: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    pool_size: int = DEFAULT_POOL_SIZE,
+) -> anthropic.Anthropic:
+    """Shared Anthropic client for `api_key`.
+
+    timeout and pool_size only apply when the client is first built;
+    later callers with the same key get the existing client.
+    """
+    key = "anthropic:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def _build() -> anthropic.Anthropic:
+        http_client = anthropic.DefaultHttpxClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        return anthropic.Anthropic(api_key=api_key, timeout=timeout, http_client=http_client)
+
+    return get_client(key, _build)
+
+
+def close_all():
+    """Close every registered client's connection pool."""
+    with _lock:
+        for client in _clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                close()
+        _clients.clear()
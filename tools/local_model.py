@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Local email classifier trained on past LLM verdicts.
+
+Hashed word / bigram / sender-domain features weighted by TF-IDF, fed to a
+multinomial logistic regression, all in NumPy. It predicts one of
+CLASSIFICATION_CATEGORIES in microseconds, and run_scan only calls the LLM
+when the top probability is below LOCAL_MODEL_THRESHOLD.
+
+Training data is the verdict log run_scan appends to (VERDICT_LOG_FILE),
+overridden by Holly's decisions in manual_review.json: an entry marked
+"decision": "add" or "skip" is taken over whatever the LLM said.
+
+Usage:
+    python tools/local_model.py report   # hold-out accuracy / latency, nothing saved
+    python tools/local_model.py train    # report, then fit on everything and save
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # optional: without NumPy there is no local model
+    np = None
+
+from config import (
+    CLASSIFICATION_CATEGORIES,
+    DATA_DIR,
+    LOCAL_MODEL_FEATURES,
+    LOCAL_MODEL_FILE,
+    LOCAL_MODEL_MIN_EXAMPLES,
+    LOCAL_MODEL_THRESHOLD,
+    MANUAL_REVIEW_FILE,
+    VERDICT_LOG_FILE,
+)
+
+TOKEN = re.compile(r"[a-z0-9']+")
+
+HOLDOUT_SHARE = 0.2
+
+
+def _tokens(email: dict) -> list[str]:
+    """Sender domain, subject words, and body words + bigrams, namespaced by field."""
+    subject = TOKEN.findall((email.get("subject") or "").lower())
+    body = TOKEN.findall((email.get("snippet") or "")[:500].lower())
+    domain = (email.get("sender_email") or "").rpartition("@")[2].lower()
+
+    tokens = ["__bias__", f"d:{domain}"]
+    tokens += [f"s:{t}" for t in subject]
+    tokens += [f"b:{t}" for t in body]
+    tokens += [f"b:{a}_{b}" for a, b in zip(body, body[1:])]
+    return tokens
+
+
+def _hashed_counts(email: dict, n_features: int) -> dict[int, int]:
+    # crc32 rather than hash(), which is salted per process
+    counts: dict[int, int] = {}
+    for token in _tokens(email):
+        i = zlib.crc32(token.encode()) % n_features
+        counts[i] = counts.get(i, 0) + 1
+    return counts
+
+
+def _vectorize(emails: list[dict], idf, n_features: int):
+    """Sparse TF-IDF rows as (indices, values, indptr), each row L2-normalized.
+
+    Every row holds at least the bias feature, so no row is empty.
+    """
+    indices, values, indptr = [], [], [0]
+    for email in emails:
+        counts = _hashed_counts(email, n_features)
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        x = tf * idf[idx]
+        x /= np.linalg.norm(x)
+        indices.append(idx)
+        values.append(x)
+        indptr.append(indptr[-1] + len(idx))
+    return np.concatenate(indices), np.concatenate(values), np.array(indptr)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class LocalModel:
+    """Hashed TF-IDF + softmax regression over CLASSIFICATION_CATEGORIES."""
+
+    def __init__(self, weights, idf, classes: list[str], threshold: float = LOCAL_MODEL_THRESHOLD):
+        self.weights = weights
+        self.idf = idf
+        self.classes = classes
+        self.threshold = threshold
+        self.n_features = len(idf)
+
+    @classmethod
+    def train(
+        cls,
+        emails: list[dict],
+        labels: list[str],
+        n_features: int = LOCAL_MODEL_FEATURES,
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4,
+    ) -> "LocalModel":
+        """Fit on emails labeled with CLASSIFICATION_CATEGORIES, by full-batch gradient descent."""
+        classes = list(CLASSIFICATION_CATEGORIES)
+        n, k = len(emails), len(classes)
+
+        df = np.zeros(n_features)
+        for email in emails:
+            df[list(_hashed_counts(email, n_features))] += 1
+        idf = np.log((1 + n) / (1 + df)) + 1
+
+        indices, values, indptr = _vectorize(emails, idf, n_features)
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        y = np.zeros((n, k))
+        y[np.arange(n), [classes.index(label) for label in labels]] = 1
+
+        weights = np.zeros((n_features, k))
+        for _ in range(epochs):
+            scores = np.add.reduceat(weights[indices] * values[:, None], indptr[:-1], axis=0)
+            residual = (_softmax(scores) - y) / n
+            grad = l2 * weights
+            np.add.at(grad, indices, values[:, None] * residual[rows])
+            weights -= learning_rate * grad
+
+        return cls(weights, idf, classes)
+
+    @classmethod
+    def load(cls, path: Path = LOCAL_MODEL_FILE) -> "LocalModel | None":
+        """Load the saved model, or None if there isn't a usable one."""
+        if np is None or not path.exists():
+            return None
+        with np.load(path) as data:
+            classes = [str(c) for c in data["classes"]]
+            if classes != list(CLASSIFICATION_CATEGORIES):
+                print(f"  Ignoring {path.name}: trained on different categories, retrain it")
+                return None
+            return cls(data["weights"], data["idf"], classes)
+
+    def save(self, path: Path = LOCAL_MODEL_FILE):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights.astype(np.float32),
+                idf=self.idf.astype(np.float32),
+                classes=np.array(self.classes),
+            )
+
+    def predict_proba(self, emails: list[dict]):
+        """Class probabilities, one row per email."""
+        indices, values, indptr = _vectorize(emails, self.idf, self.n_features)
+        scores = np.add.reduceat(self.weights[indices] * values[:, None], indptr[:-1], axis=0)
+        return _softmax(scores)
+
+    def classify(self, email: dict) -> dict | None:
+        """Verdict in email_classifier's shape, or None when not confident enough."""
+        proba = self.predict_proba([email])[0]
+        best = int(proba.argmax())
+        if proba[best] < self.threshold:
+            return None
+        classification = self.classes[best]
+        return {
+            "should_add": classification != "not_relevant",
+            "classification": classification,
+            "confidence": "high",
+            "reason": f"Local model ({proba[best]:.0%} confident)",
+        }
+
+
+def log_verdicts(pairs: list[tuple[dict, dict]]):
+    """Append LLM verdicts to the training log."""
+    if not pairs:
+        return
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    logged_at = datetime.now(timezone.utc).isoformat()
+    with open(VERDICT_LOG_FILE, "a") as f:
+        for email, result in pairs:
+            record = {
+                "sender_email": email["sender_email"],
+                "sender_name": email["sender_name"],
+                "subject": email["subject"],
+                "snippet": email["snippet"][:500],
+                "should_add": result["should_add"],
+                "classification": result["classification"],
+                "confidence": result["confidence"],
+                "logged_at": logged_at,
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def _label(should_add: bool, classification: str) -> str:
+    """Fold should_add into the label: anything not worth adding is not_relevant."""
+    if not should_add:
+        return "not_relevant"
+    if classification not in CLASSIFICATION_CATEGORIES or classification == "not_relevant":
+        return "general_interest"
+    return classification
+
+
+def load_examples() -> tuple[list[dict], list[str]]:
+    """Labeled (emails, labels) from the verdict log plus manual review decisions.
+
+    Low-confidence LLM verdicts are left out. Later records for the same
+    sender + subject replace earlier ones, and manual decisions replace LLM
+    verdicts.
+    """
+    examples: dict[tuple[str, str], tuple[dict, str]] = {}
+
+    if VERDICT_LOG_FILE.exists():
+        with open(VERDICT_LOG_FILE) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["confidence"] == "low":
+                    continue  # too noisy to learn from unless Holly decides it
+                label = _label(record["should_add"], record["classification"])
+                examples[(record["sender_email"], record["subject"])] = (record, label)
+
+    if MANUAL_REVIEW_FILE.exists():
+        with open(MANUAL_REVIEW_FILE) as f:
+            for entry in json.load(f):
+                decision = entry.get("decision")
+                if decision not in ("add", "skip"):
+                    continue
+                label = _label(decision == "add", entry.get("classification", ""))
+                key = (entry["sender_email"], entry["subject"])
+                email = examples.get(key, (entry, None))[0]
+                examples[key] = (email, label)
+
+    emails = [email for email, _ in examples.values()]
+    labels = [label for _, label in examples.values()]
+    return emails, labels
+
+
+def _is_holdout(email: dict) -> bool:
+    """Stable split by sender, so one sender's emails never land on both sides."""
+    return zlib.crc32(email["sender_email"].encode()) % 100 < HOLDOUT_SHARE * 100
+
+
+def _report(model: LocalModel, emails: list[dict], labels: list[str]):
+    proba = model.predict_proba(emails)
+    predicted = [model.classes[i] for i in proba.argmax(axis=1)]
+    confident = proba.max(axis=1) >= model.threshold
+
+    n = len(emails)
+    exact = sum(p == t for p, t in zip(predicted, labels))
+    add_agree = sum((p != "not_relevant") == (t != "not_relevant") for p, t in zip(predicted, labels))
+    decided = [(p, t) for p, t, c in zip(predicted, labels, confident) if c]
+    decided_agree = sum((p != "not_relevant") == (t != "not_relevant") for p, t in decided)
+
+    start = time.perf_counter()
+    for email in emails:
+        model.classify(email)
+    per_email = (time.perf_counter() - start) / n
+
+    print(f"  Category accuracy:   {exact}/{n} ({exact / n:.1%})")
+    print(f"  Should-add accuracy: {add_agree}/{n} ({add_agree / n:.1%})")
+    print(f"  Above threshold:     {len(decided)}/{n} ({len(decided) / n:.0%}) at p >= {model.threshold}")
+    if decided:
+        print(
+            f"  Should-add accuracy above threshold: {decided_agree}/{len(decided)} "
+            f"({decided_agree / len(decided):.1%})"
+        )
+    print(f"  Latency:             {per_email * 1e6:.0f} µs/email")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local email classifier")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument(
+        "--threshold", type=float, default=LOCAL_MODEL_THRESHOLD, help="Confidence cut-off for the report"
+    )
+    parser.add_argument("--epochs", type=int, default=300)
+    args = parser.parse_args()
+
+    if np is None:
+        print("Error: NumPy is required (pip install numpy)")
+        sys.exit(1)
+
+    emails, labels = load_examples()
+    print(f"{len(emails)} labeled emails")
+    if len(emails) < LOCAL_MODEL_MIN_EXAMPLES:
+        print(f"Error: need at least {LOCAL_MODEL_MIN_EXAMPLES}; let run_scan log more verdicts first")
+        sys.exit(1)
+
+    train = [(e, l) for e, l in zip(emails, labels) if not _is_holdout(e)]
+    test = [(e, l) for e, l in zip(emails, labels) if _is_holdout(e)]
+    start = time.perf_counter()
+    model = LocalModel.train([e for e, _ in train], [l for _, l in train], epochs=args.epochs)
+    model.threshold = args.threshold
+    print(f"Trained on {len(train)} in {time.perf_counter() - start:.1f}s; {len(test)} held out\n")
+    if test:
+        _report(model, [e for e, _ in test], [l for _, l in test])
+
+    if args.command == "train":
+        model = LocalModel.train(emails, labels, epochs=args.epochs)
+        model.save()
+        print(f"\nSaved model trained on all {len(emails)} emails to {LOCAL_MODEL_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Lightweight timing and counters for one process run.
+
+Spans time a block (a run_scan stage, or one external call); counters
+tally things like API calls. Both are process-wide and thread-safe, so the
+Gmail, Sheets and Anthropic wrappers can record into them from wherever
+they run, and run_scan reads everything back for its run report:
+
+    with metrics.span("gmail.messages.list"):
+        results = request.execute()
+    metrics.count("gmail.messages.get", len(ids))
+
+A span's name is also how it is reported: "stage.*" for run_scan's own
+stages, "<api>.<method>" for external calls.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import DATA_DIR
+
+_lock = threading.Lock()
+_spans: dict[str, list] = {}  # name -> [calls, total seconds, slowest]
+_counters: dict[str, int] = {}
+
+
+def record(name: str, seconds: float):
+    """Add one timed call to the span `name`."""
+    with _lock:
+        stats = _spans.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Time the with-block as one call of `name`, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot() -> dict:
+    """Everything recorded so far, as plain JSON-ready data."""
+    with _lock:
+        return {
+            "spans": {
+                name: {"calls": calls, "total_s": round(total, 4), "max_s": round(slowest, 4)}
+                for name, (calls, total, slowest) in sorted(_spans.items())
+            },
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+def append_report(path: Path, report: dict):
+    """Append one run report as a JSON line."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+
+def print_spans(*prefixes: str):
+    """Human summary of the spans whose names start with any of `prefixes`, slowest total first."""
+    spans = [(name, stats) for name, stats in snapshot()["spans"].items() if name.startswith(prefixes)]
+    for name, stats in sorted(spans, key=lambda item: -item[1]["total_s"]):
+        print(f"  {name:<36} {stats['total_s']:8.2f}s  {stats['calls']:>6} calls")
@@ -0,0 +1,156 @@
+"""Local rule-based pre-classification, run before anything is sent to the LLM.
+
+Decides the obvious cases — automated senders that slipped past
+GMAIL_EXCLUDE_SENDERS, receipts, shipping notices, account alerts, and
+plainly worded booking requests — from headers, sender reputation and
+compiled keyword rules. Anything ambiguous, including an email that trips
+both a noise rule and a lead rule, is deferred to the LLM.
+
+Verdicts have the same shape as email_classifier results, plus the name of
+the rule that decided them.
+"""
+
+import re
+
+from config import PREFILTER_AUTOMATED_LOCALPARTS, PREFILTER_NOISE_DOMAINS
+
+# Precedence header values that mark list / mass mail (RFC 3834, RFC 2076)
+BULK_PRECEDENCE = {"bulk", "list", "junk"}
+
+# (rule, reason, pattern) — matched against subject + body preview
+NOISE_RULES = [
+    (
+        "receipt",
+        "Receipt or order confirmation",
+        r"\b(receipt|order confirmation|order #|order number|your order|"
+        r"payment (received|confirmation)|invoice #?\d+)",
+    ),
+    (
+        "shipping",
+        "Shipping notice",
+        r"\b(has shipped|out for delivery|tracking number|your (package|shipment|delivery)|"
+        r"scheduled for delivery|was delivered)\b",
+    ),
+    (
+        "account",
+        "Account or security notification",
+        r"\b(verification code|verify your (email|account)|password reset|reset your password|"
+        r"security alert|sign-in attempt|new sign-in|one-time (code|passcode)|"
+        r"statement is (ready|available))\b",
+    ),
+    (
+        "promo",
+        "Promotional offer",
+        r"(\d+% off|\bpre-?approved\b|\blimited time offer\b|\bact now\b|\bclick (here|now) to claim\b)",
+    ),
+]
+
+# (rule, classification, reason, pattern) — only trusted when the email also
+# mentions tarot or readings (LEAD_TOPIC)
+LEAD_RULES = [
+    (
+        "booking",
+        "booking_inquiry",
+        "Asks to book a reading",
+        r"\b(book|schedule|reserve)\s+(a|an|some|my|\d+|two|three)?\s*(tarot\s+)?"
+        r"(readings?|sessions?|appointments?)\b",
+    ),
+    (
+        "event",
+        "event_inquiry",
+        "Asks about readings at an event",
+        r"\b(tarot|readings?|reader)\b.{0,80}\b(party|wedding|event|festival|fair|market|"
+        r"shower|celebration|gathering)\b",
+    ),
+    (
+        "quote",
+        "quote_request",
+        "Asks about pricing",
+        r"\b(how much|what (do|would) you charge|your (rates|pricing|prices)|a quote)\b",
+    ),
+    (
+        "student",
+        "tarot_student",
+        "Asks about tarot lessons",
+        r"\b(tarot\s+(class|classes|lessons?|workshops?|course)|learn (to read )?tarot)\b",
+    ),
+]
+
+LEAD_TOPIC = re.compile(r"\b(tarot|readings?|reader)\b", re.IGNORECASE)
+
+_NOISE_RULES = [(rule, reason, re.compile(p, re.IGNORECASE)) for rule, reason, p in NOISE_RULES]
+_LEAD_RULES = [
+    (rule, classification, reason, re.compile(p, re.IGNORECASE | re.DOTALL))
+    for rule, classification, reason, p in LEAD_RULES
+]
+
+
+def _is_noise_domain(domain: str) -> bool:
+    """Match a sender domain, or any parent of it, against PREFILTER_NOISE_DOMAINS."""
+    labels = domain.split(".")
+    return any(".".join(labels[i:]) in PREFILTER_NOISE_DOMAINS for i in range(len(labels) - 1))
+
+
+def _noise_signal(email: dict, text: str) -> tuple[str, str] | None:
+    """Return (rule, reason) for the first noise signal found, or None."""
+    sender = email["sender_email"].lower()
+    local, _, domain = sender.partition("@")
+
+    if "crystalseedtarot" in sender or "hollymcole" in sender:
+        return "own", "Sent by the business itself"
+    if email.get("auto_submitted") and email["auto_submitted"] != "no":
+        return "auto_submitted", "Auto-Submitted header (automated message)"
+    if email.get("precedence") in BULK_PRECEDENCE:
+        return "precedence", f"Precedence: {email['precedence']} header (mass mail)"
+    if local in PREFILTER_AUTOMATED_LOCALPARTS:
+        return "automated_sender", f"Automated mailbox ({local}@)"
+    if _is_noise_domain(domain):
+        return "noise_domain", f"Transactional sender domain ({domain})"
+
+    for rule, reason, pattern in _NOISE_RULES:
+        if pattern.search(text):
+            return rule, reason
+    return None
+
+
+def _lead_signal(text: str) -> tuple[str, str, str] | None:
+    """Return (rule, classification, reason) for the first lead rule that fires, or None."""
+    if not LEAD_TOPIC.search(text):
+        return None
+    for rule, classification, reason, pattern in _LEAD_RULES:
+        if pattern.search(text):
+            return rule, classification, reason
+    return None
+
+
+def preclassify(email: dict) -> dict | None:
+    """Classify an email locally, or return None to defer it to the LLM.
+
+    Only emails with exactly one kind of signal — noise or lead — get a
+    verdict, and every verdict is high confidence.
+    """
+    text = f"{email.get('subject') or ''}\n{email.get('snippet') or ''}"
+    noise = _noise_signal(email, text)
+    lead = _lead_signal(text)
+
+    if noise and lead:
+        return None
+    if noise:
+        rule, reason = noise
+        return {
+            "should_add": False,
+            "classification": "not_relevant",
+            "confidence": "high",
+            "reason": f"{reason} (local rule)",
+            "rule": rule,
+        }
+    if lead:
+        rule, classification, reason = lead
+        return {
+            "should_add": True,
+            "classification": classification,
+            "confidence": "high",
+            "reason": f"{reason} (local rule)",
+            "rule": rule,
+        }
+    return None
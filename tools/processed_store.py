@@ -0,0 +1,91 @@
+"""Compact store of Gmail message IDs the scanner has already processed.
+
+Backed by SQLite so each run only inserts the IDs it saw (no rewriting the
+whole history), with IDs that have fallen out of the scan window pruned.
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+from config import DATA_DIR, PROCESSED_IDS_DB
+
+
+class ProcessedIdStore:
+    """Set-like store of processed message IDs with time-based expiry.
+
+    The IDs still inside the retention window are loaded into memory on open,
+    so membership checks are plain set lookups. New IDs are inserted as they
+    are added and only become durable on commit(); closing without a commit
+    (e.g. the scan was interrupted mid-page) discards them.
+    """
+
+    def __init__(self, path: Path = PROCESSED_IDS_DB):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_ids ("
+            "id TEXT PRIMARY KEY, seen_at INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS processed_ids_seen_at ON processed_ids (seen_at)"
+        )
+        self._conn.commit()
+        self._ids = {row[0] for row in self._conn.execute("SELECT id FROM processed_ids")}
+
+    def __contains__(self, msg_id: str) -> bool:
+        return msg_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, msg_id: str):
+        """Mark a message as processed (durable after the next commit())."""
+        if msg_id in self._ids:
+            return
+        self._ids.add(msg_id)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO processed_ids (id, seen_at) VALUES (?, ?)",
+            (msg_id, int(time.time())),
+        )
+
+    def commit(self):
+        self._conn.commit()
+
+    def prune(self, before: float) -> int:
+        """Drop IDs first seen before the given Unix timestamp. Returns the count removed."""
+        expired = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT id FROM processed_ids WHERE seen_at < ?", (int(before),)
+            )
+        ]
+        self._conn.execute("DELETE FROM processed_ids WHERE seen_at < ?", (int(before),))
+        self._conn.commit()
+        self._ids.difference_update(expired)
+        return len(expired)
+
+    def migrate(self, state: dict) -> bool:
+        """Move a legacy `processed_ids` list out of the scan state into the store.
+
+        Returns True if the state was changed and needs saving.
+        """
+        legacy_ids = state.pop("processed_ids", None)
+        if legacy_ids is None:
+            return False
+
+        for msg_id in legacy_ids:
+            self.add(msg_id)
+        self.commit()
+        print(f"Migrated {len(legacy_ids)} processed IDs to {PROCESSED_IDS_DB.name}.")
+        return True
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
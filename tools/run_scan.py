@@ -4,18 +4,65 @@
 Usage:
     python tools/run_scan.py           # Full scan
     python tools/run_scan.py --dry-run # Preview without adding
+    python tools/run_scan.py --profile # Also profile the run with cProfile
+
+Every run appends a JSON report (counts, per-stage and per-API timings,
+token usage) to RUN_REPORT_FILE.
 """
 
+import argparse
+import cProfile
 import json
+import pstats
+import queue
 import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 
-from config import MANUAL_REVIEW_FILE, OAUTH_TOKEN_FILE, SCOPES, DATA_DIR
-from email_classifier import classify_email
-from gmail_scanner import scan_emails, scan_for_unsubscribes
-from sheets_manager import add_contact, get_all_emails, remove_contact, is_subscribed
+import llm_clients
+import metrics
+from config import (
+    DATA_DIR,
+    MANUAL_REVIEW_FILE,
+    OAUTH_TOKEN_FILE,
+    PIPELINE_CLASSIFY_MAX_PAGES,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_ROUTE_WORKERS,
+    PROFILE_FILE,
+    RUN_REPORT_FILE,
+    SCOPES,
+)
+from classification_cache import ClassificationCache
+from contacts import ContactWriter, get_all_emails, get_store, is_subscribed
+from email_classifier import PROMPT_VERSION, classify_emails, get_usage
+from gmail_scanner import iter_email_pages, route_page
+from local_model import LocalModel, log_verdicts
+from prefilter import preclassify
+
+PROFILE_TOP_N = 25  # functions shown by --profile
+
+# Always present in the run report's "counts", even when zero
+REPORT_COUNTS = (
+    "scanned",
+    "added",
+    "skipped_existing",
+    "skipped_irrelevant",
+    "skipped_bulk",
+    "flagged_review",
+    "classify_errors",
+    "unsubscribed",
+    "candidates",
+    "preclassified",
+    "model_decided",
+    "bodies_skipped",
+    "bytes_skipped",
+    "bulk_writes",
+)
 
 
 def load_credentials() -> Credentials:
@@ -45,57 +92,239 @@ def save_for_review(emails: list[dict]):
         json.dump(existing, f, indent=2)
 
 
-def main():
-    dry_run = "--dry-run" in sys.argv
-
-    if dry_run:
-        print("DRY RUN — no contacts will be added\n")
-
-    # Step 1: Authenticate
-    print("Authenticating...")
-    creds = load_credentials()
-
-    # Step 2: Get existing contacts to avoid duplication
-    print("Loading existing contacts...")
-    existing_emails = get_all_emails(creds)
-    print(f"  {len(existing_emails)} contacts already in sheet\n")
-
-    # Step 3: Scan Gmail
-    print("Scanning Gmail...")
-    emails = scan_emails(creds)
-
-    if not emails:
-        print("\nNo new emails to process.")
-        return
-
-    # Step 4: Process each email
-    added = 0
-    skipped_existing = 0
-    skipped_irrelevant = 0
-    flagged_review = 0
-
-    for email in emails:
+# End of a stage's input; also what _Pipeline.get returns once stopped
+_DONE = object()
+
+
+class _Pipeline:
+    """Bounded queues between stage threads, with one shared stop signal.
+
+    put/get wait in short slices so that once any stage fails (stop is set)
+    every other stage stops waiting on its queues and winds down.
+    """
+
+    POLL_SECONDS = 0.1
+
+    def __init__(self, profilers: list[cProfile.Profile] | None = None):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.errors: list[BaseException] = []
+        self.threads: list[threading.Thread] = []
+        self.profilers = profilers  # with --profile, each stage thread adds its own
+
+    def put(self, q: queue.Queue, item) -> bool:
+        """Put, blocking while the queue is full (backpressure). False once stopped."""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=self.POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, q: queue.Queue):
+        """Next item, or _DONE once stopped."""
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=self.POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def start(self, name: str, target, *args):
+        def run():
+            profiler = self._profile_thread()
+            try:
+                target(*args)
+            except BaseException as e:
+                self.errors.append(e)
+                self.stop.set()
+            finally:
+                if profiler:
+                    profiler.disable()
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def _profile_thread(self) -> cProfile.Profile | None:
+        """With --profile, start a profiler for the calling stage thread.
+
+        Before Python 3.12 a profiler only sees the thread that enabled it.
+        From 3.12 the main thread's profiler already covers every thread and
+        a second one can't be enabled, so there's nothing to add.
+        """
+        if self.profilers is None:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        with self.lock:
+            self.profilers.append(profiler)
+        return profiler
+
+
+def _fetch_stage(pipeline: _Pipeline, creds: Credentials, out: queue.Queue, acks: queue.Queue):
+    """List and fetch Gmail pages, numbering them so the writer can restore order."""
+    pages = iter_email_pages(creds, acks=acks)
+    try:
+        for seq, emails in enumerate(pages):
+            if not pipeline.put(out, {"seq": seq, "emails": emails}):
+                return
+        pipeline.put(out, _DONE)
+    finally:
+        pages.close()
+
+
+def _route_stage(
+    pipeline: _Pipeline,
+    creds: Credentials,
+    existing_emails: set[str],
+    model: LocalModel | None,
+    source: queue.Queue,
+    out: queue.Queue,
+    workers_left: list[int],
+):
+    """Route a page on its headers (existing-contact check), fetch the bodies
+    it needs, and decide what the rules and the local model are sure of."""
+    while (page := pipeline.get(source)) is not _DONE:
+        emails = page["emails"]
+        # A snapshot, since the writer keeps adding to existing_emails
+        known = {e["sender_email"] for e in emails if e["sender_email"] in existing_emails}
+        with metrics.span("stage.route_page"):
+            leads, unsubscribes, skipped = route_page(creds, emails, known)
+
+        with metrics.span("stage.classify_local"):
+            verdicts = []
+            model_decided = 0
+            for email in leads:
+                verdict = preclassify(email)
+                if verdict is None and model:
+                    verdict = model.classify(email)
+                    model_decided += verdict is not None
+                verdicts.append(verdict)
+
+        n_known = sum(1 for e in emails if e["sender_email"] in known)
+        page.update(leads=leads, unsubscribes=unsubscribes, verdicts=verdicts)
+        page["counts"] = Counter(
+            scanned=len(emails),
+            skipped_existing=n_known,
+            skipped_bulk=len(emails) - n_known - len(leads),
+            bodies_skipped=len(skipped),
+            bytes_skipped=sum(e["size_estimate"] for e in skipped),
+            candidates=len(leads),
+            preclassified=sum(v is not None for v in verdicts),
+            model_decided=model_decided,
+        )
+        if not pipeline.put(out, page):
+            return
+
+    # Let sibling workers see the end too; the last one out passes it on
+    pipeline.put(source, _DONE)
+    with pipeline.lock:
+        workers_left[0] -= 1
+        last = workers_left[0] == 0
+    if last:
+        pipeline.put(out, _DONE)
+
+
+def _classify_stage(pipeline: _Pipeline, source: queue.Queue, out: queue.Queue, caches: list[ClassificationCache]):
+    """Send what the local stages left undecided to the LLM.
+
+    Under a backlog, the deferred emails of every page already waiting (up
+    to PIPELINE_CLASSIFY_MAX_PAGES) go out in one classify_emails call, so
+    its worker pool isn't limited to one page's worth of requests.
+    """
+    cache = ClassificationCache(PROMPT_VERSION)  # SQLite: opened on the thread that uses it
+    caches.append(cache)
+    try:
+        done = False
+        while not done:
+            page = pipeline.get(source)
+            if page is _DONE:
+                break
+            batch = [page]
+            while len(batch) < PIPELINE_CLASSIFY_MAX_PAGES:
+                try:
+                    page = source.get_nowait()
+                except queue.Empty:
+                    break
+                if page is _DONE:
+                    done = True
+                    break
+                batch.append(page)
+
+            deferred = [(p, i) for p in batch for i, v in enumerate(p["verdicts"]) if v is None]
+            emails = [p["leads"][i] for p, i in deferred]
+            with metrics.span("stage.classify_llm"):
+                sent = []
+                results = classify_emails(emails, cache=cache, sent=sent)
+                # Only the LLM's own answers are training data, not cache hits or sender skips
+                log_verdicts([(emails[i], results[i]) for i in sent if not isinstance(results[i], Exception)])
+            for (p, i), result in zip(deferred, results):
+                p["verdicts"][i] = result
+
+            for p in batch:
+                if not pipeline.put(out, p):
+                    return
+        pipeline.put(out, _DONE)
+    finally:
+        cache.close()
+
+
+def _write_page(
+    page: dict,
+    writer: ContactWriter,
+    creds: Credentials,
+    existing_emails: set[str],
+    dry_run: bool,
+    counts: Counter,
+    dry_unsubscribed: set[str],
+):
+    """Apply one classified page: unsubscribes, then new contacts.
+
+    `dry_unsubscribed` collects the addresses a dry run would have
+    unsubscribed, so each is counted once per scan, as in a real run.
+    """
+    counts.update(page["counts"])
+
+    with metrics.span("stage.unsubscribe"):
+        for unsub in page["unsubscribes"]:
+            email_addr = unsub["sender_email"]
+            # The store doesn't see queued changes until the writer flushes
+            if writer.pending_status(email_addr) == "unsubscribed" or email_addr.lower() in dry_unsubscribed:
+                continue
+            if is_subscribed(creds, email_addr):
+                print(f"\nUnsubscribe request: {email_addr} ('{unsub['subject']}')")
+                if dry_run:
+                    dry_unsubscribed.add(email_addr.lower())
+                    print("  → Would unsubscribe")
+                else:
+                    writer.remove(email_addr)
+                    print("  → Unsubscribed")
+                counts["unsubscribed"] += 1
+
+    for email, result in zip(page["leads"], page["verdicts"]):
         sender = email["sender_email"]
         name = email["sender_name"]
 
-        # Skip if already in sheet
+        # Skip if added earlier in this scan
         if sender.lower() in existing_emails:
-            skipped_existing += 1
+            counts["skipped_existing"] += 1
             continue
 
-        # Classify with AI
         print(f"\nClassifying: {name} <{sender}>")
         print(f"  Subject: {email['subject']}")
 
-        try:
-            result = classify_email(
-                sender_name=name,
-                sender_email=sender,
-                subject=email["subject"],
-                snippet=email["snippet"],
-            )
-        except Exception as e:
-            print(f"  Error classifying: {e}")
+        if isinstance(result, Exception):
+            print(f"  Error classifying: {result}")
+            counts["classify_errors"] += 1
             continue
 
         print(f"  → {result['classification']} (confidence: {result['confidence']})")
@@ -103,17 +332,18 @@ def main():
         print(f"  → Reason: {result['reason']}")
 
         if not result["should_add"]:
-            skipped_irrelevant += 1
+            counts["skipped_irrelevant"] += 1
             continue
 
         if result["confidence"] == "low":
-            flagged_review += 1
+            counts["flagged_review"] += 1
             save_for_review(
                 [
                     {
                         "sender_email": sender,
                         "sender_name": name,
                         "subject": email["subject"],
+                        "snippet": email["snippet"][:500],
                         "classification": result["classification"],
                         "reason": result["reason"],
                     }
@@ -125,10 +355,9 @@ def main():
         # Add to sheet
         if dry_run:
             print(f"  → Would add: {sender}")
-            added += 1
+            counts["added"] += 1
         else:
-            success = add_contact(
-                creds,
+            success = writer.add(
                 email=sender,
                 name=name,
                 source="gmail_scan",
@@ -136,46 +365,192 @@ def main():
                 notes=result["reason"],
             )
             if success:
-                added += 1
+                counts["added"] += 1
                 existing_emails.add(sender.lower())
                 print(f"  → Added to sheet!")
             else:
-                skipped_existing += 1
+                counts["skipped_existing"] += 1
+
+    with metrics.span("stage.contact_writes"):
+        writer.flush()
+
+
+def scan(dry_run: bool, counts: Counter, profilers: list[cProfile.Profile] | None = None):
+    """One scan, tallying into `counts` as it goes.
+
+    Pages flow through a pipeline of stages joined by bounded queues, so
+    Gmail fetches, LLM classification and contact writes overlap:
+
+        fetch (1 thread) → route + local verdicts (PIPELINE_ROUTE_WORKERS)
+          → LLM classification (1 thread, CLASSIFY_CONCURRENCY requests)
+          → contact writes (this thread, pages back in Gmail order)
+
+    A full queue blocks the stage feeding it, so no stage runs more than
+    PIPELINE_QUEUE_SIZE pages ahead of the next. A page is marked processed
+    in Gmail's scan state only after its writes are flushed. If any stage
+    fails, the rest stop, nothing past the last written page is marked, and
+    the error is raised here. With `profilers`, each stage thread profiles
+    itself and adds its profiler to the list.
+    """
+    # Step 1: Authenticate
+    print("Authenticating...")
+    creds = load_credentials()
+
+    # Step 2: Get existing contacts to avoid duplication
+    print("Loading existing contacts...")
+    with metrics.span("stage.load_contacts"):
+        existing_emails = get_all_emails(creds)
+    print(f"  {len(existing_emails)} contacts already in sheet\n")
+
+    # Step 3 + 4: Scan Gmail once, sending each page through both the lead
+    # and unsubscribe stages as it arrives
+    print("Scanning Gmail...")
+    model = LocalModel.load()
+
+    pipeline = _Pipeline(profilers)
+    fetched = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    routed = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    classified = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    acks = queue.Queue()  # one item per written page, back to the fetcher
+    caches = []
+
+    pipeline.start("fetch", _fetch_stage, pipeline, creds, fetched, acks)
+    workers_left = [PIPELINE_ROUTE_WORKERS]
+    for n in range(PIPELINE_ROUTE_WORKERS):
+        pipeline.start(
+            f"route-{n}", _route_stage, pipeline, creds, existing_emails, model, fetched, routed, workers_left
+        )
+    pipeline.start("classify", _classify_stage, pipeline, routed, classified, caches)
+
+    try:
+        with ContactWriter(get_store(creds)) as writer:
+            # Route workers can finish pages out of order; write them in order
+            # so acks (and so Gmail checkpoints) follow page order
+            ready: dict[int, dict] = {}
+            next_seq = 0
+            dry_unsubscribed: set[str] = set()
+            while (page := pipeline.get(classified)) is not _DONE:
+                ready[page["seq"]] = page
+                while next_seq in ready:
+                    _write_page(
+                        ready.pop(next_seq), writer, creds, existing_emails, dry_run, counts, dry_unsubscribed
+                    )
+                    acks.put(next_seq)
+                    next_seq += 1
+            if pipeline.errors:
+                raise pipeline.errors[0]
+            counts["bulk_writes"] = writer.requests
+    except BaseException:
+        pipeline.stop.set()
+        acks.put(None)  # abandon: the fetcher saves nothing past the last acked page
+        raise
+    finally:
+        pipeline.join()
+
+    cache = caches[0]
+    counts["cache_hits"] = cache.hits
+    counts["cache_misses"] = cache.misses
+    counts["sender_skips"] = cache.sender_skips
+
+    if not counts["scanned"]:
+        print("\nNo new emails to process.")
+        return
 
     # Summary
     action = "Would add" if dry_run else "Added"
     print(f"\n{'=' * 40}")
     print(f"Scan Complete!")
     print(f"{'=' * 40}")
-    print(f"  {action}:              {added}")
-    print(f"  Skipped (existing):    {skipped_existing}")
-    print(f"  Skipped (irrelevant):  {skipped_irrelevant}")
-    print(f"  Flagged for review:    {flagged_review}")
-
-    if flagged_review > 0:
+    print(f"  {action}:              {counts['added']}")
+    print(f"  Skipped (existing):    {counts['skipped_existing']}")
+    print(f"  Skipped (irrelevant):  {counts['skipped_irrelevant']}")
+    print(f"  Skipped (bulk mail):   {counts['skipped_bulk']}")
+    print(f"  Flagged for review:    {counts['flagged_review']}")
+    print(
+        f"  Full fetches skipped:  {counts['bodies_skipped']} "
+        f"(~{counts['bytes_skipped'] // 1024} KB not downloaded)"
+    )
+    print(
+        f"  Classification cache:  {cache.hits} hits, {cache.misses} misses, "
+        f"{cache.sender_skips} senders skipped"
+    )
+    candidates = counts["candidates"]
+    reached_llm = cache.misses
+    share = f"{reached_llm / candidates:.0%}" if candidates else "n/a"
+    print(
+        f"  Decided locally:       {counts['preclassified']} of {candidates} candidates "
+        f"({counts['model_decided']} by the local model)"
+    )
+    print(f"  Reached the LLM:       {reached_llm} of {candidates} ({share})")
+    usage = get_usage()
+    print(
+        f"  LLM input tokens:      {usage['input_tokens']} uncached, "
+        f"{usage['cache_read_input_tokens']} cache reads, "
+        f"{usage['cache_creation_input_tokens']} cache writes "
+        f"({usage['requests']} requests)"
+    )
+
+    action = "Would unsubscribe" if dry_run else "Unsubscribed"
+    print(f"  {action + ':':<23}{counts['unsubscribed']}")
+
+    if counts["flagged_review"] > 0:
         print(f"\n  Review flagged emails: {MANUAL_REVIEW_FILE}")
 
-    # Step 5: Check for unsubscribe requests
-    print("\nChecking for unsubscribe requests...")
-    unsub_emails = scan_for_unsubscribes(creds)
-    unsubscribed = 0
-
-    for unsub in unsub_emails:
-        email_addr = unsub["sender_email"]
-        if is_subscribed(creds, email_addr):
-            if dry_run:
-                print(f"  Would unsubscribe: {email_addr} ('{unsub['subject']}')")
-                unsubscribed += 1
-            else:
-                remove_contact(creds, email_addr)
-                print(f"  Unsubscribed: {email_addr} ('{unsub['subject']}')")
-                unsubscribed += 1
-
-    if unsubscribed:
-        action = "Would unsubscribe" if dry_run else "Unsubscribed"
-        print(f"  {action}: {unsubscribed}")
-    else:
-        print("  No unsubscribe requests found.")
+
+def _print_profile(profilers: list[cProfile.Profile]):
+    """Merge the main and stage thread profiles, save them for snakeviz /
+    pstats and show the top entries."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(*profilers)
+    stats.dump_stats(PROFILE_FILE)
+    print(f"\nProfile (all pipeline threads), saved to {PROFILE_FILE}:")
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan Gmail, classify emails and add contacts")
+    parser.add_argument("--dry-run", action="store_true", help="Preview without adding")
+    parser.add_argument("--profile", action="store_true", help="Run under cProfile and print the hot spots")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print("DRY RUN — no contacts will be added\n")
+
+    counts = Counter(dict.fromkeys(REPORT_COUNTS, 0))
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "dry_run": args.dry_run,
+        "status": "ok",
+    }
+    profiler = cProfile.Profile() if args.profile else None
+    profilers = [profiler] if profiler else None
+    start = time.perf_counter()
+    try:
+        if profiler:
+            profiler.enable()
+        scan(args.dry_run, counts, profilers)
+    except BaseException as e:
+        report["status"] = "error"
+        report["error"] = repr(e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        report["duration_s"] = round(time.perf_counter() - start, 3)
+        report["counts"] = dict(counts)
+        report["llm_usage"] = get_usage()
+        report.update(metrics.snapshot())
+        metrics.append_report(RUN_REPORT_FILE, report)
+
+        if counts["scanned"]:
+            print(f"\nTime by stage ({report['duration_s']:.1f}s total):")
+            metrics.print_spans("stage.")
+            print("\nExternal calls:")
+            metrics.print_spans("gmail.", "sheets.", "anthropic.")
+            print(f"\n  Run report: {RUN_REPORT_FILE}")
+        if profiler:
+            _print_profile(profilers)
+        llm_clients.close_all()
 
 
 if __name__ == "__main__":
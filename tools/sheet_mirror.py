@@ -0,0 +1,88 @@
+"""Local SQLite mirror of the contact sheet.
+
+SheetsContactStore keeps a copy of the sheet rows here, together with a
+version signature of the remote sheet and the columns it has downloaded so
+far (see sheets_manager). On its first read it compares that signature with
+a cheap remote probe and only downloads columns again when they differ;
+every write it makes goes to both the sheet and the mirror.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+from config import DATA_DIR, SHEET_MIRROR_DB
+
+
+class SheetMirror:
+    """Rows of one spreadsheet by sheet row number, plus headers and signature.
+
+    The store may only have loaded some columns; the mirror records which
+    ones its rows are complete for.
+    """
+
+    def __init__(self, path: Path = SHEET_MIRROR_DB):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rows (
+                row_number INTEGER PRIMARY KEY,
+                cells TEXT NOT NULL
+            );
+            """
+        )
+
+    def _meta(self) -> dict:
+        return dict(self._conn.execute("SELECT key, value FROM meta"))
+
+    def load(self, sheet_id: str) -> tuple[list[str], dict[int, list[str]], str, list[str]] | None:
+        """Return (headers, {row_number: cells}, signature, columns), or None if this sheet isn't mirrored."""
+        meta = self._meta()
+        if meta.get("sheet_id") != sheet_id or "columns" not in meta:
+            return None
+        rows = {n: json.loads(cells) for n, cells in self._conn.execute("SELECT row_number, cells FROM rows")}
+        return json.loads(meta["headers"]), rows, meta["signature"], json.loads(meta["columns"])
+
+    def replace(
+        self,
+        sheet_id: str,
+        headers: list[str],
+        rows: dict[int, list[str]],
+        signature: str,
+        columns: list[str],
+    ):
+        """Swap in a new copy of the sheet, complete for `columns`."""
+        with self._conn:
+            self._conn.execute("DELETE FROM rows")
+            self._conn.execute("DELETE FROM meta")
+            self._conn.executemany(
+                "INSERT INTO rows (row_number, cells) VALUES (?, ?)",
+                ((n, json.dumps(cells)) for n, cells in rows.items()),
+            )
+            self._conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("sheet_id", sheet_id),
+                    ("headers", json.dumps(headers)),
+                    ("signature", signature),
+                    ("columns", json.dumps(columns)),
+                ],
+            )
+
+    def put_rows(self, rows: dict[int, list[str]], signature: str):
+        """Write through new or changed rows, along with the sheet's new signature."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row_number, cells) VALUES (?, ?)",
+                ((n, json.dumps(cells)) for n, cells in rows.items()),
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'signature'", (signature,))
+
+    def close(self):
+        self._conn.close()
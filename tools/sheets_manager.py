@@ -1,13 +1,24 @@
-"""Google Sheets CRUD operations for the email contact list."""
+"""Google Sheets backend for the email contact list (see contacts.py for the public API)."""
 
 import hashlib
 import hmac
+import json
+import re
+import time
 from datetime import datetime, timezone
 
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-from config import get_sheets_id, get_unsubscribe_secret, SHEET_RANGE
+from config import (
+    SHEET_RANGE,
+    SHEET_WRITE_RETRIES,
+    get_sheets_id,
+    get_unsubscribe_secret,
+)
+import metrics
+from sheet_mirror import SheetMirror
 
 
 def _get_service(creds: Credentials):
@@ -15,6 +26,11 @@ def _get_service(creds: Credentials):
     return build("sheets", "v4", credentials=creds)
 
 
+def _get_drive_service(creds: Credentials):
+    """Build the Drive API service (only used to read the sheet's version)."""
+    return build("drive", "v3", credentials=creds)
+
+
 def _generate_unsubscribe_token(email: str) -> str:
     """Generate an HMAC-SHA256 token for secure unsubscribe links."""
     secret = get_unsubscribe_secret()
@@ -23,125 +39,445 @@ def _generate_unsubscribe_token(email: str) -> str:
     ).hexdigest()
 
 
-def get_all_contacts(creds: Credentials) -> list[dict]:
-    """Return all contacts from the sheet as a list of dicts."""
-    service = _get_service(creds)
-    sheet_id = get_sheets_id()
-
-    result = (
-        service.spreadsheets()
-        .values()
-        .get(spreadsheetId=sheet_id, range=f"{SHEET_RANGE}!A:H")
-        .execute()
-    )
-    rows = result.get("values", [])
-
-    if not rows:
-        return []
-
-    # First row is headers
-    headers = rows[0]
-    contacts = []
-    for row in rows[1:]:
-        # Pad row to match headers length
-        padded = row + [""] * (len(headers) - len(row))
-        contacts.append(dict(zip(headers, padded)))
-
-    return contacts
+# Column order of the contact sheet
+HEADERS = [
+    "Email",
+    "Name",
+    "Source",
+    "Date Added",
+    "Classification",
+    "Status",
+    "Unsubscribe Token",
+    "Notes",
+]
 
 
-def get_all_emails(creds: Credentials) -> set[str]:
-    """Return a set of all email addresses currently in the sheet (lowercase)."""
-    contacts = get_all_contacts(creds)
-    return {c.get("Email", "").lower() for c in contacts if c.get("Email")}
-
-
-def is_subscribed(creds: Credentials, email: str) -> bool:
-    """Check if an email is in the sheet with active status."""
-    contacts = get_all_contacts(creds)
-    for c in contacts:
-        if c.get("Email", "").lower() == email.lower():
-            return c.get("Status", "active") == "active"
-    return False
-
-
-def add_contact(
-    creds: Credentials,
+def new_contact_row(
     email: str,
     name: str = "",
     source: str = "manual",
     classification: str = "",
     notes: str = "",
-) -> bool:
-    """Add a contact to the sheet. Returns False if email already exists."""
-    existing = get_all_emails(creds)
-    if email.lower() in existing:
-        return False
-
-    service = _get_service(creds)
-    sheet_id = get_sheets_id()
-
+) -> list[str]:
+    """Build a row, in HEADERS order, for a new active contact."""
     token = _generate_unsubscribe_token(email)
     now = datetime.now(timezone.utc).isoformat()
-
-    row = [email, name, source, now, classification, "active", token, notes]
-
-    service.spreadsheets().values().append(
-        spreadsheetId=sheet_id,
-        range=f"{SHEET_RANGE}!A:H",
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body={"values": [row]},
-    ).execute()
-
-    return True
-
-
-def remove_contact(creds: Credentials, email: str) -> bool:
-    """Set a contact's status to 'unsubscribed'. Returns False if not found."""
-    service = _get_service(creds)
-    sheet_id = get_sheets_id()
-
-    result = (
-        service.spreadsheets()
-        .values()
-        .get(spreadsheetId=sheet_id, range=f"{SHEET_RANGE}!A:H")
-        .execute()
-    )
-    rows = result.get("values", [])
-
-    for i, row in enumerate(rows):
-        if i == 0:
-            continue  # skip header
-        if row and row[0].lower() == email.lower():
-            # Column F (index 5) is Status
-            cell = f"{SHEET_RANGE}!F{i + 1}"
-            service.spreadsheets().values().update(
-                spreadsheetId=sheet_id,
-                range=cell,
+    return [email, name, source, now, classification, "active", token, notes]
+
+
+def is_active(status: str) -> bool:
+    """Whether a Status cell means subscribed. A blank cell counts as active,
+    as rows typed into the sheet by hand often leave it empty."""
+    return (status or "active") == "active"
+
+
+ROW_IN_RANGE = re.compile(r"![A-Z]+(\d+)")
+
+# Any of these lets SheetsContactStore read the sheet's Drive version number. They
+# aren't in SCOPES by default; add one and re-run setup.py to use it instead
+# of the checksum probe.
+DRIVE_SCOPES = {
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/drive.readonly",
+    "https://www.googleapis.com/auth/drive.metadata",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+}
+
+# Without Drive access, the sheet's version is a checksum of these columns,
+# which are also exactly what dedupe and subscription checks read, so the
+# probe doubles as their data. Tokens are derived from the email, and edits
+# confined to other columns (names, notes) don't trigger a reload.
+PROBE_COLUMNS = ["Email", "Status"]
+
+# Write errors worth retrying (quota exceeded, transient 5xx)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# An append that fails with a 5xx may still have written its rows, and
+# appending again would duplicate them; a 429 is rejected before any write
+APPEND_RETRYABLE_STATUSES = {429}
+
+
+def _execute(request, retries: int = SHEET_WRITE_RETRIES, retry_statuses: set[int] = RETRYABLE_STATUSES) -> dict:
+    """Execute a Sheets request, backing off exponentially on rate limits.
+
+    Only errors in `retry_statuses` are retried. Each attempt is timed as a
+    metrics span named after the API method, e.g.
+    "sheets.spreadsheets.values.batchGet".
+    """
+    name = getattr(request, "methodId", "sheets.request")
+    for attempt in range(retries + 1):
+        try:
+            with metrics.span(name):
+                return request.execute()
+        except HttpError as e:
+            if e.resp.status not in retry_statuses or attempt == retries:
+                raise
+            metrics.count("sheets.retries")
+            time.sleep(2**attempt)
+
+
+def _column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def _probe_term(row_number: int, email: str, status: str) -> int:
+    """One data row's share of the probe checksum.
+
+    The checksum is the sum of these over the sheet, so a write can update
+    it from the rows it touched instead of rehashing every row.
+    """
+    if not email and not status:
+        return 0  # blank rows, and cells past a column's trimmed end
+    digest = hashlib.sha256(json.dumps([row_number, email, status]).encode()).digest()
+    return int.from_bytes(digest[:16], "big")
+
+
+def _probe_signature(total: int) -> str:
+    return f"probe:{total % 2**128:032x}"
+
+
+class SheetsContactStore:
+    """Contact backend on the Google Sheet, indexed in memory and mirrored to SQLite.
+
+    Columns are loaded lazily: each read declares the columns it needs and
+    only those are fetched, one majorDimension=COLUMNS range each, so a
+    dedupe check downloads the Email column rather than all of A:H. Lookups
+    by email (case-insensitive) and unsubscribe token are then dict hits. Where an email appears on several rows the first one
+    wins, as the old linear scans did.
+
+    On the first read the sheet's version — the Drive version number when
+    the credentials allow it, otherwise a checksum of PROBE_COLUMNS — is
+    compared with the SQLite mirror's, and whatever columns the mirror holds
+    are used if it's current. Writes go to the sheet first and then to the
+    indexes and the mirror. `service`, `drive_service` and `mirror` can be
+    passed in place of real ones (e.g. fakes in a test).
+    """
+
+    def __init__(
+        self,
+        creds: Credentials | None = None,
+        service=None,
+        drive_service=None,
+        mirror: SheetMirror | None = None,
+    ):
+        self._service = service or _get_service(creds)
+        if drive_service is None and creds is not None and DRIVE_SCOPES & set(creds.scopes or []):
+            drive_service = _get_drive_service(creds)
+        self._drive = drive_service
+        self._mirror = mirror or SheetMirror()
+        self._sheet_id = get_sheets_id()
+        self._reset()
+
+    def _reset(self):
+        self._signature: str | None = None
+        self._loaded: set[str] = set()
+        self._cells: dict[int, list[str]] = {}  # by sheet row number, HEADERS-wide
+        self._unverified = False  # loaded from the mirror without a probe (token lookups)
+
+    def reload(self, columns: list[str] = HEADERS):
+        """Re-download `columns` (by default all of them), ignoring the mirror."""
+        self._reset()
+        self._signature, probed = self._remote_signature()
+        self._merge_columns(probed)
+        self._load(columns, changed=True)
+
+    def _ensure(self, columns: list[str]):
+        """Make sure `columns` are loaded, fetching only what's missing."""
+        if self._unverified:
+            # Loaded for token lookups without a probe: check it before anything else reads it
+            self._unverified = False
+            signature, _ = self._remote_signature()
+            if signature != self._signature:
+                self._reset()
+        if set(columns) <= self._loaded:
+            return
+
+        changed = False
+        if self._signature is None:
+            # First read in this process: is the mirror still current?
+            self._signature, probed = self._remote_signature()
+            cached = self._mirror.load(self._sheet_id)
+            if cached and cached[2] == self._signature:
+                _, self._cells, _, mirrored = cached
+                self._loaded = set(mirrored)
+            else:
+                changed = True
+            self._merge_columns(probed)
+
+        self._load(columns, changed)
+
+    def _load(self, columns: list[str], changed: bool = False):
+        """Fetch the columns not loaded yet, then re-index and, if anything
+        new came from the sheet, re-mirror."""
+        missing = [c for c in HEADERS if c in columns and c not in self._loaded]
+        if missing:
+            self._merge_columns(self._fetch_columns(missing))
+        self._reindex()
+        if missing or changed:
+            self._mirror.replace(self._sheet_id, HEADERS, self._cells, self._signature, sorted(self._loaded))
+
+    def _fetch_columns(self, names: list[str]) -> dict[str, list[str]]:
+        """Fetch whole columns, each as a list with the header cell first."""
+        ranges = []
+        for name in names:
+            letter = _column_letter(HEADERS.index(name))
+            ranges.append(f"{SHEET_RANGE}!{letter}:{letter}")
+        result = _execute(
+            self._service.spreadsheets()
+            .values()
+            .batchGet(spreadsheetId=self._sheet_id, ranges=ranges, majorDimension="COLUMNS")
+        )
+        return {
+            name: (vr.get("values") or [[]])[0]
+            for name, vr in zip(names, result.get("valueRanges", []))
+        }
+
+    def _merge_columns(self, columns: dict[str, list[str]]):
+        """Copy fetched columns into the row cells; cells past a column's end are blank."""
+        last_row = max([len(values) for values in columns.values()] + list(self._cells) + [1])
+        for row_number in range(2, last_row + 1):
+            self._cells.setdefault(row_number, [""] * len(HEADERS))
+        for name, values in columns.items():
+            i = HEADERS.index(name)
+            for row_number, row in self._cells.items():
+                row[i] = values[row_number - 1] if row_number <= len(values) else ""
+            self._loaded.add(name)
+
+    def _reindex(self):
+        self._by_email: dict[str, list[str]] = {}
+        self._row_by_email: dict[str, int] = {}
+        self._row_by_token: dict[str, int] = {}
+        self._last_row = max(self._cells, default=1)
+        for row_number in sorted(self._cells):
+            self._index(self._cells[row_number], row_number)
+        if not self._drive:
+            status_index = HEADERS.index("Status")
+            self._terms = {n: _probe_term(n, row[0], row[status_index]) for n, row in self._cells.items()}
+            self._probe_total = sum(self._terms.values())
+
+    def _index(self, row: list[str], row_number: int):
+        email = row[0].lower()
+        if email and email not in self._by_email:
+            self._by_email[email] = row
+            self._row_by_email[email] = row_number
+        token = row[HEADERS.index("Unsubscribe Token")]
+        if token:
+            self._row_by_token.setdefault(token, row_number)
+
+    def _drive_version(self) -> str:
+        file = _execute(self._drive.files().get(fileId=self._sheet_id, fields="version"))
+        return f"drive:{file['version']}"
+
+    def _remote_signature(self) -> tuple[str, dict[str, list[str]]]:
+        """The remote sheet's version, plus the probed columns when that's how it was taken."""
+        if self._drive:
+            return self._drive_version(), {}
+        probed = self._fetch_columns(PROBE_COLUMNS)
+        emails, statuses = probed["Email"], probed["Status"]
+        total = 0
+        for row_number in range(2, max(len(emails), len(statuses)) + 1):
+            email = emails[row_number - 1] if row_number <= len(emails) else ""
+            status = statuses[row_number - 1] if row_number <= len(statuses) else ""
+            total += _probe_term(row_number, email, status)
+        return _probe_signature(total), probed
+
+    def _write_through(self, rows: dict[int, list[str]]):
+        """Mirror rows just written to the sheet, with the sheet's new version."""
+        if self._drive:
+            self._signature = self._drive_version()
+        else:
+            status_index = HEADERS.index("Status")
+            for row_number, row in rows.items():
+                term = _probe_term(row_number, row[0], row[status_index])
+                self._probe_total += term - self._terms.get(row_number, 0)
+                self._terms[row_number] = term
+            self._signature = _probe_signature(self._probe_total)
+        self._mirror.put_rows(rows, self._signature)
+
+    def _contact(self, row: list[str] | None, columns: list[str] = HEADERS) -> dict | None:
+        if row is None:
+            return None
+        return {name: row[HEADERS.index(name)] for name in columns}
+
+    def __len__(self) -> int:
+        self._ensure(["Email"])
+        return len(self._cells)
+
+    def __contains__(self, email: str) -> bool:
+        self._ensure(["Email"])
+        return email.lower() in self._by_email
+
+    def contacts(self, columns: list[str] = HEADERS) -> list[dict]:
+        """Every contact in sheet order, with just the given columns."""
+        self._ensure(columns)
+        return [self._contact(self._cells[n], columns) for n in sorted(self._cells)]
+
+    def emails(self) -> set[str]:
+        """Every email address in the sheet, lowercase."""
+        self._ensure(["Email"])
+        return set(self._by_email)
+
+    def get(self, email: str) -> dict | None:
+        self._ensure(HEADERS)
+        return self._contact(self._by_email.get(email.lower()))
+
+    def get_by_token(self, token: str) -> dict | None:
+        self._ensure(HEADERS)
+        return self._contact(self._cells.get(self._row_by_token.get(token)))
+
+    def is_subscribed(self, email: str) -> bool:
+        self._ensure(["Email", "Status"])
+        row = self._by_email.get(email.lower())
+        return bool(row) and is_active(row[HEADERS.index("Status")])
+
+    def append_rows(self, rows: list[list[str]]):
+        """Append rows in a single request and index them.
+
+        Callers are responsible for not appending emails already present.
+        """
+        if not rows:
+            return
+        self._ensure(["Email"])
+        result = _execute(
+            self._service.spreadsheets()
+            .values()
+            .append(
+                spreadsheetId=self._sheet_id,
+                range=f"{SHEET_RANGE}!A:H",
                 valueInputOption="RAW",
-                body={"values": [["unsubscribed"]]},
-            ).execute()
-            return True
-
-    return False
-
-
-def get_contact_by_token(creds: Credentials, token: str) -> dict | None:
-    """Look up a contact by their unsubscribe token."""
-    contacts = get_all_contacts(creds)
-    for c in contacts:
-        if c.get("Unsubscribe Token") == token:
-            return c
-    return None
-
+                insertDataOption="INSERT_ROWS",
+                body={"values": rows},
+            ),
+            retry_statuses=APPEND_RETRYABLE_STATUSES,
+        )
 
-def unsubscribe_by_token(creds: Credentials, token: str) -> bool:
-    """Unsubscribe a contact using their token. Returns False if token not found."""
-    contact = get_contact_by_token(creds, token)
-    if not contact:
-        return False
-    return remove_contact(creds, contact["Email"])
+        # The sheet reports where the rows actually landed
+        match = ROW_IN_RANGE.search(result.get("updates", {}).get("updatedRange", ""))
+        first_row = int(match.group(1)) if match else self._last_row + 1
+        written = {}
+        for row_number, row in enumerate(rows, start=first_row):
+            written[row_number] = row + [""] * (len(HEADERS) - len(row))
+            self._cells[row_number] = written[row_number]
+            self._index(written[row_number], row_number)
+        self._last_row = max(self._last_row, first_row + len(rows) - 1)
+        self._write_through(written)
+
+    def update_statuses(self, changes: dict[str, str]):
+        """Write {email: status} for existing contacts in a single batchUpdate.
+
+        Emails not in the sheet are ignored.
+        """
+        self._ensure(["Email"])
+        rows = {}
+        for email, status in changes.items():
+            row_number = self._row_by_email.get(email.lower())
+            if row_number is not None:
+                rows[row_number] = status
+        self._write_statuses(rows)
+
+    def unsubscribe_by_token(self, token: str) -> bool:
+        """Unsubscribe the contact holding `token`. Returns False if no row has it.
+
+        Only the Email and token columns are needed, and the row is re-read
+        on its own before writing, since the probe doesn't cover tokens and
+        rows may have been sorted or deleted in the sheet since the index
+        was built. That check is what makes the mirror safe to use here
+        without probing the sheet first. If the row no longer matches, or
+        an unprobed mirror doesn't have the token at all, those two columns
+        are re-downloaded once.
+        """
+        columns = ["Email", "Unsubscribe Token"]
+        if not (self._unverified or self._load_mirror_unverified(columns)):
+            self._ensure(columns)
+        row_number = self._row_by_token.get(token)
+        if row_number is not None:
+            stale = not self._row_matches(row_number, token)
+        else:
+            # An unchecked mirror may predate the contact
+            stale = self._unverified
+        if stale:
+            self.reload(columns)
+            row_number = self._row_by_token.get(token)
+        if row_number is None:
+            return False
+        self._write_statuses({row_number: "unsubscribed"})
+        return True
+
+    def _load_mirror_unverified(self, columns: list[str]) -> bool:
+        """On the first read, load the mirror without probing the sheet's version.
+
+        Only with the checksum probe, which is what costs a download (a
+        Drive version check is one small request), and only if the mirror
+        holds `columns`. The index stays loaded for further token lookups;
+        any other read probes first. Returns False if nothing was loaded.
+        """
+        if self._signature is not None or self._drive:
+            return False
+        cached = self._mirror.load(self._sheet_id)
+        if not cached or not set(columns) <= set(cached[3]):
+            return False
+        # A stale signature stays stale after write-through: the next probe won't match it
+        _, self._cells, self._signature, mirrored = cached
+        self._loaded = set(mirrored)
+        self._unverified = True
+        self._reindex()
+        return True
+
+    def _row_matches(self, row_number: int, token: str) -> bool:
+        """Whether the sheet still has this row's email and `token` at row_number."""
+        last = _column_letter(HEADERS.index("Unsubscribe Token"))
+        result = _execute(
+            self._service.spreadsheets()
+            .values()
+            .get(spreadsheetId=self._sheet_id, range=f"{SHEET_RANGE}!A{row_number}:{last}{row_number}")
+        )
+        remote = (result.get("values") or [[]])[0]
+        remote += [""] * (len(HEADERS) - len(remote))
+        local = self._cells[row_number]
+        return remote[0].lower() == local[0].lower() and remote[HEADERS.index("Unsubscribe Token")] == token
+
+    def _write_statuses(self, rows: dict[int, str]):
+        """Write {row_number: status} in a single batchUpdate."""
+        if not rows:
+            return
+        status_index = HEADERS.index("Status")
+        column = _column_letter(status_index)
+        data = [{"range": f"{SHEET_RANGE}!{column}{n}", "values": [[status]]} for n, status in rows.items()]
+        _execute(
+            self._service.spreadsheets()
+            .values()
+            .batchUpdate(spreadsheetId=self._sheet_id, body={"valueInputOption": "RAW", "data": data})
+        )
+        for row_number, status in rows.items():
+            self._cells[row_number][status_index] = status
+        self._write_through({n: self._cells[n] for n in rows})
+
+    def add(
+        self,
+        email: str,
+        name: str = "",
+        source: str = "manual",
+        classification: str = "",
+        notes: str = "",
+    ) -> bool:
+        """Append a contact. Returns False if the email already exists."""
+        if email in self:
+            return False
+        self.append_rows([new_contact_row(email, name, source, classification, notes)])
+        return True
+
+    def set_status(self, email: str, status: str) -> bool:
+        """Update a contact's Status cell. Returns False if not found."""
+        if email not in self:
+            return False
+        self.update_statuses({email: status})
+        return True
 
 
 def create_sheet_with_headers(creds: Credentials) -> str:
@@ -167,22 +503,11 @@ def create_sheet_with_headers(creds: Credentials) -> str:
     grid_id = spreadsheet["sheets"][0]["properties"]["sheetId"]
 
     # Add headers
-    headers = [
-        "Email",
-        "Name",
-        "Source",
-        "Date Added",
-        "Classification",
-        "Status",
-        "Unsubscribe Token",
-        "Notes",
-    ]
-
     service.spreadsheets().values().update(
         spreadsheetId=sheet_id,
         range="Sheet1!A1:H1",
         valueInputOption="RAW",
-        body={"values": [headers]},
+        body={"values": [HEADERS]},
     ).execute()
 
     # Bold the header row and freeze it